@@ -0,0 +1,259 @@
+from tesseractUtils import loadImage, imageToOsd, imageToString, imageToData, setEngine, ENGINES
+from pytesseract import TesseractError
+import preprocessing
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pytesseract
+
+"""
+Benchmark por etapa do fluxo de OCR sobre um conjunto de imagens (padrão: img/).
+
+Cada imagem passa por todas as etapas: decodificação, escala de cinza, cada
+binarização, morfologia, cada blur, OSD, imageToString e imageToData. Para
+cada etapa são medidos o tempo de relógio, o tempo de CPU do processo e dos
+processos filhos (o executável tesseract na engine 'cli'), o pico de memória
+alocada pelo Python/numpy (tracemalloc) e imagens por segundo.
+
+O resultado é salvo em JSON e dois arquivos podem ser comparados com --compare.
+
+Uso:
+    python benchmark.py --output antes.json
+    python benchmark.py --output depois.json --compare antes.json
+"""
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp')
+MORPHOLOGY_KERNEL = np.ones((5, 5), np.uint8)
+
+# (nome, entrada, função). A entrada é 'data' (bytes do arquivo), 'bgr' ou 'gray'.
+PREPROCESSING_STAGES = [
+    ('decode', 'data', lambda data: loadImage(data).bgr),
+    ('grayscale', 'bgr', preprocessing.grayscale),
+    ('binarizationSimple', 'gray', lambda gray: preprocessing.binarizationSimple(gray, 140, 255)),
+    ('binarizationOtsu', 'gray', preprocessing.binarizationOtsu),
+    ('binarizationAdaptive', 'gray', preprocessing.binarizationAdaptive),
+    ('binarizationAdaptiveGaussiana', 'gray', preprocessing.binarizationAdaptiveGaussiana),
+    ('colorInversion', 'gray', preprocessing.colorInversion),
+    ('erosion', 'gray', lambda gray: preprocessing.removeNoiseErosionTechnique(gray, MORPHOLOGY_KERNEL)),
+    ('dilation', 'gray', lambda gray: preprocessing.removeNoiseDilationTechnique(gray, MORPHOLOGY_KERNEL)),
+    ('removeNoise', 'gray', preprocessing.removeNoise),
+    ('blur', 'gray', preprocessing.blur),
+    ('blurByGaussian', 'gray', preprocessing.blurByGaussian),
+    ('blurByMedia', 'gray', preprocessing.blurByMedia),
+    ('bilateralBlur', 'gray', preprocessing.bilateralBlur)
+]
+
+def ocrStages(lang, config):
+    """
+    Etapas que chamam o Tesseract, todas sobre a imagem em escala de cinza.
+
+    Args:
+        lang (str): Código do idioma.
+        config (str): Configurações Tesseract.
+
+    Returns:
+        list[tuple[str, str, callable]]: Etapas no mesmo formato de PREPROCESSING_STAGES.
+    """
+    return [
+        ('imageToOsd', 'gray', imageToOsd),
+        ('imageToString', 'gray', lambda gray: imageToString(gray, lang, config)),
+        ('imageToData', 'gray', lambda gray: imageToData(gray, lang, config))
+    ]
+
+def listImages(source):
+    """
+    Args:
+        source (str): Pasta de imagens.
+
+    Returns:
+        list[str]: Caminhos das imagens em ordem alfabética.
+    """
+    return sorted(
+        os.path.join(source, name) for name in os.listdir(source)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def cpuTimes():
+    """
+    Returns:
+        tuple[float, float]: CPU (usuário + sistema) do processo e dos filhos já encerrados.
+            No Windows o tempo dos filhos não é informado pelo sistema e fica 0.
+    """
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+def measure(func, value, repeat):
+    """
+    Executa uma etapa `repeat` vezes e mede tempo, CPU e pico de memória.
+
+    O tempo e a CPU são medidos sem o tracemalloc, que deixa cada alocação do
+    Python/numpy bem mais lenta; o pico de memória vem de uma execução extra,
+    fora da medição de tempo.
+
+    Args:
+        func (callable): Etapa (entrada -> saída).
+        value (object): Entrada da etapa.
+        repeat (int): Número de execuções.
+
+    Returns:
+        tuple[object, dict]: Última saída e medidas ('wall', 'cpu', 'childCpu', 'peakMemory').
+    """
+    cpuStart, childStart = cpuTimes()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = func(value)
+    wall = time.perf_counter() - start
+    cpuEnd, childEnd = cpuTimes()
+
+    tracemalloc.start()
+    try:
+        func(value)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return output, {
+        'wall': wall,
+        'cpu': cpuEnd - cpuStart,
+        'childCpu': childEnd - childStart,
+        'peakMemory': peak
+    }
+
+def run(paths, stages, repeat=1):
+    """
+    Executa todas as etapas em todas as imagens.
+
+    A saída de 'decode' alimenta as etapas 'bgr' e a de 'grayscale' as etapas 'gray'.
+
+    Args:
+        paths (list[str]): Imagens.
+        stages (list[tuple[str, str, callable]]): Etapas a medir.
+        repeat (int): Execuções de cada etapa por imagem.
+
+    Returns:
+        dict: Medidas agregadas por etapa.
+    """
+    totals = {name: {'images': 0, 'errors': 0, 'wall': 0.0, 'cpu': 0.0, 'childCpu': 0.0, 'peakMemory': 0} for name, _, _ in stages}
+    for path in paths:
+        with open(path, 'rb') as file:
+            inputs = {'data': file.read()}
+        for name, source, func in stages:
+            if source not in inputs:
+                continue
+            try:
+                output, stats = measure(func, inputs[source], repeat)
+            except (TesseractError, OSError, RuntimeError) as e:
+                totals[name]['errors'] += 1
+                totals[name]['lastError'] = f'{type(e).__name__}: {e}'
+                continue
+            if name == 'decode':
+                inputs['bgr'] = output
+            elif name == 'grayscale':
+                inputs['gray'] = output
+            total = totals[name]
+            total['images'] += 1
+            total['wall'] += stats['wall']
+            total['cpu'] += stats['cpu']
+            total['childCpu'] += stats['childCpu']
+            total['peakMemory'] = max(total['peakMemory'], stats['peakMemory'])
+
+    for total in totals.values():
+        runs = total['images'] * repeat
+        total['imagesPerSecond'] = runs / total['wall'] if total['wall'] else None
+    return totals
+
+def compare(current, previous):
+    """
+    Monta linhas comparando o tempo de relógio por imagem de duas execuções.
+
+    Args:
+        current (dict): Resultado atual.
+        previous (dict): Resultado anterior (mesmo formato do JSON salvo).
+
+    Returns:
+        list[str]: Uma linha por etapa presente nos dois resultados.
+    """
+    lines = []
+    for name, stage in current['stages'].items():
+        old = previous['stages'].get(name)
+        if not old or not stage['imagesPerSecond'] or not old['imagesPerSecond']:
+            continue
+        now, before = 1 / stage['imagesPerSecond'], 1 / old['imagesPerSecond']
+        lines.append(f'{name:32} {before * 1000:10.2f} ms -> {now * 1000:10.2f} ms ({(now - before) / before * 100:+.1f}%)')
+    return lines
+
+def report(result):
+    """
+    Args:
+        result (dict): Resultado de main().
+
+    Returns:
+        list[str]: Tabela com as medidas por etapa.
+    """
+    lines = [f'{"etapa":32} {"imgs":>5} {"wall(s)":>9} {"cpu(s)":>9} {"filhos(s)":>9} {"pico(KiB)":>10} {"img/s":>9}']
+    for name, stage in result['stages'].items():
+        rate = f'{stage["imagesPerSecond"]:9.2f}' if stage['imagesPerSecond'] else f'{"-":>9}'
+        lines.append(
+            f'{name:32} {stage["images"]:5d} {stage["wall"]:9.3f} {stage["cpu"]:9.3f} '
+            f'{stage["childCpu"]:9.3f} {stage["peakMemory"] / 1024:10.1f} {rate}'
+            + (f'  ({stage["errors"]} erro(s): {stage["lastError"]})' if stage['errors'] else '')
+        )
+    return lines
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark por etapa do pré-processamento e do OCR.')
+    parser.add_argument('--images', default='img', help='pasta de imagens (padrão: img)')
+    parser.add_argument('--output', '-o', help='arquivo JSON de saída')
+    parser.add_argument('--compare', metavar='JSON', help='resultado anterior para comparar')
+    parser.add_argument('--repeat', type=int, default=1, help='execuções de cada etapa por imagem')
+    parser.add_argument('--lang', default='por', help='idioma do Tesseract')
+    parser.add_argument('--config', default='--tessdata-dir tessdata', help='configurações do Tesseract')
+    parser.add_argument('--engine', choices=ENGINES, default='cli', help='engine do Tesseract')
+    parser.add_argument('--tesseract-cmd', default=None, help='caminho do executável tesseract')
+    parser.add_argument('--skip-ocr', action='store_true', help='mede só a leitura e o pré-processamento')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parseArgs(argv)
+    if args.tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+    setEngine(args.engine)
+
+    stages = list(PREPROCESSING_STAGES)
+    if not args.skip_ocr:
+        stages += ocrStages(args.lang, args.config)
+
+    paths = listImages(args.images)
+    start = time.perf_counter()
+    result = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': args.engine,
+            'lang': args.lang,
+            'config': args.config,
+            'repeat': args.repeat,
+            'images': len(paths)
+        },
+        'stages': run(paths, stages, args.repeat)
+    }
+    result['meta']['total'] = time.perf_counter() - start
+
+    print('\n'.join(report(result)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            previous = json.load(file)
+        print('\n' + '\n'.join(compare(result, previous)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
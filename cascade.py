@@ -0,0 +1,147 @@
+import time
+from ocrData import OcrData
+from pipeline import PreprocessingPipeline, readSpec
+from tesseractUtils import imageToAll, remainingTime
+
+"""
+OCR em cascata: primeiro uma passada barata, pré-processamento pesado só quando precisa.
+
+A maioria das imagens é limpa e o Tesseract já reconhece bem com o mínimo de
+pré-processamento. A cascata faz o OCR com o primeiro nível (o mais leve),
+lê a confiança média das palavras e só tenta os níveis seguintes, cada vez
+mais pesados, enquanto a confiança ficar abaixo do alvo. O resultado informa
+em qual nível cada imagem terminou.
+
+Contém funções para:
+- Calcular a confiança média das palavras de um resultado
+- Executar a cascata de pipelines de pré-processamento
+"""
+
+DEFAULT_TIERS = [
+    ['convertBGRtoRGB'],
+    ['grayscale', 'binarizationOtsu'],
+    ['grayscale', 'autoResize', 'binarizationOtsu', 'blurByMedia'],
+    ['grayscale', 'autoResize', 'binarizationAdaptiveGaussiana', 'removeNoise', 'blurByMedia']
+]
+
+def meanConfidence(result):
+    """
+    Confiança média das palavras reconhecidas (ignora conf -1 e textos vazios).
+
+    Args:
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+
+    Returns:
+        float: Confiança média de 0 a 100 (0 se nenhuma palavra foi reconhecida).
+    """
+    table = OcrData.fromDict(result)
+    conf = table['conf'][table.words() & table.nonEmpty() & (table['conf'] >= 0)]
+    return float(conf.mean()) if len(conf) else 0.0
+
+class OcrCascade:
+    """
+    Sequência de pipelines, do mais leve ao mais pesado, com um alvo de confiança.
+
+    Serializável com pickle, então pode ser enviada à OcrWorkerFarm (opção cascade).
+
+    Uso:
+        cascade = OcrCascade(threshold=75)
+        result = cascade.run(img, 'por', '--tessdata-dir tessdata')
+        print(result['cascade']['tier'], result['cascade']['confidence'])
+    """
+
+    def __init__(self, tiers=None, threshold=70, reuseBuffers=False):
+        """
+        Args:
+            tiers (list | str | None): Lista de níveis (cada um uma especificação de
+                pipeline ou um PreprocessingPipeline), ou caminho de arquivo JSON/YAML /
+                texto JSON com essa lista (ou um objeto {"tiers": [...]}). Se None, usa DEFAULT_TIERS.
+            threshold (float): Confiança média mínima para parar a cascata.
+            reuseBuffers (bool): Se os pipelines devem reaproveitar buffers entre imagens.
+
+        Raises:
+            ValueError: Caso algum nível seja inválido ou a lista esteja vazia.
+        """
+        tiers = DEFAULT_TIERS if tiers is None else readSpec(tiers)
+        if isinstance(tiers, dict):
+            tiers = tiers.get('tiers')
+        if not isinstance(tiers, list) or not tiers:
+            raise ValueError('A cascata precisa de uma lista com pelo menos um nível')
+        self.tiers = [
+            tier if isinstance(tier, PreprocessingPipeline) else PreprocessingPipeline(tier, reuseBuffers)
+            for tier in tiers
+        ]
+        self.threshold = threshold
+
+    def describe(self):
+        """
+        Returns:
+            str: Descrição estável (usada na chave do cache).
+        """
+        return f'cascade[{self.threshold}; ' + ', '.join(tier.describe() for tier in self.tiers) + ']'
+
+    def run(self, img, lang, config_tesseract, osd=False, timeout=0):
+        """
+        Executa os níveis em ordem até a confiança média atingir o alvo.
+
+        O OSD (se pedido) é calculado só no primeiro nível, pois a orientação não
+        depende do pré-processamento. Se nenhum nível atingir o alvo, fica o
+        resultado de maior confiança.
+
+        Args:
+            img (numpy.ndarray): Imagem original (BGR).
+            lang (str): Código do idioma.
+            config_tesseract (str): Configurações Tesseract.
+            osd (bool): Se deve detectar a orientação.
+            timeout (float): Tempo máximo da cascata inteira em segundos, contado a partir
+                desta chamada (0 = sem limite). Cada execução do Tesseract recebe o que
+                resta; se o tempo acabar depois do primeiro nível, fica o melhor até ali.
+
+        Raises:
+            TimeoutError: Caso o tempo acabe antes do primeiro nível terminar.
+
+        Returns:
+            dict: Mesmas chaves de imageToAll mais 'image' (imagem pré-processada do
+            nível escolhido), 'timings' (pré-processamento e OCR somados) e 'cascade'
+            com 'tier' (índice do nível escolhido), 'confidence' e 'attempts'.
+        """
+        best = None
+        attempts = []
+        timings = {'preprocess': 0.0, 'ocr': 0.0}
+        osdResult = None
+        deadline = time.monotonic() + timeout if timeout else None
+        for index, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            processed = tier(img)
+            preprocessTime = time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                result = imageToAll(
+                    processed, lang, config_tesseract, osd=osd and index == 0, text=False, timeout=remainingTime(deadline)
+                )
+            except TimeoutError:
+                if best is None:
+                    raise
+                break
+            ocrTime = time.perf_counter() - start
+
+            if index == 0:
+                osdResult = result['osd']
+            confidence = meanConfidence(result['data'])
+            timings['preprocess'] += preprocessTime
+            timings['ocr'] += ocrTime
+            attempts.append({'tier': index, 'confidence': confidence, 'preprocess': preprocessTime, 'ocr': ocrTime})
+            if best is None or confidence > best[1]:
+                # copia: o pipeline pode reaproveitar o buffer na próxima imagem
+                best = (index, confidence, result, processed.copy() if tier.reuseBuffers else processed)
+            if confidence >= self.threshold:
+                break
+
+        index, confidence, result, processed = best
+        result = dict(result)
+        result['osd'] = osdResult
+        result['image'] = processed
+        result['timings'] = timings
+        result['cascade'] = {'tier': index, 'confidence': confidence, 'attempts': attempts}
+        return result
@@ -0,0 +1,160 @@
+import re
+import numpy as np
+from ocrData import OcrData
+
+"""
+Extração de campos (datas, CPF, CNPJ, valores, CEP, telefones) do resultado do OCR.
+
+Os padrões ficam em um registro nomeado e são compilados uma única vez em uma
+só expressão (alternância de grupos nomeados). O texto da página é montado a
+partir das palavras do image_to_data guardando o deslocamento de cada palavra,
+a expressão percorre o texto inteiro uma vez e cada ocorrência é mapeada de
+volta para as caixas das palavras que cobre. Assim valores que o Tesseract
+quebrou em vários tokens (ex: '12/10/' '2024') também são encontrados.
+
+Contém funções para:
+- Montar o texto da página com o deslocamento de cada palavra
+- Compilar um registro de padrões nomeados
+- Extrair as ocorrências com as palavras e a caixa de cada uma
+"""
+
+# A ordem importa: quando dois padrões casam na mesma posição vence o primeiro.
+PATTERNS = {
+    'cnpj': r'\b\d{2}\.?\d{3}\.?\d{3}\s?/\s?\d{4}\s?-?\s?\d{2}\b',
+    'cpf': r'\b\d{3}\.\d{3}\.\d{3}\s?-\s?\d{2}\b|\b\d{11}\b',
+    'date': r'\b[0-3]?[0-9]\s?/\s?[0-1]?[0-9]\s?/\s?[0-9]{4}\b',
+    'currency': r'R\$\s?\d{1,3}(?:\.\d{3})+(?:,\d{2})?\b|R\$\s?\d+(?:,\d{2})?\b',
+    'phone': r'(?:\(\s?\d{2}\s?\)\s?)?\b9?\d{4}\s?-\s?\d{4}\b',
+    'cep': r'\b\d{2}\.?\d{3}\s?-\s?\d{3}\b'
+}
+
+def pageText(result, minConfi=-1):
+    """
+    Monta o texto da página a partir das palavras, guardando onde cada uma começa.
+
+    Palavras da mesma linha são separadas por espaço e linhas diferentes por '\\n'.
+
+    Args:
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+        minConfi (int): Confiança mínima (exclusiva) das palavras usadas.
+
+    Returns:
+        tuple[str, numpy.ndarray, numpy.ndarray, numpy.ndarray]: Texto, início e fim
+        de cada palavra no texto e o índice dela no resultado.
+    """
+    table = OcrData.fromDict(result)
+    selected = table.indices(table.words() & table.nonEmpty() & table.confident(minConfi))
+    texts = table['text'][selected]
+    lengths = np.char.str_len(texts).astype(np.int64)
+
+    lineKey = np.stack([table[name][selected] for name in ('page_num', 'block_num', 'par_num', 'line_num')], axis=1)
+    newLine = np.ones(len(selected), bool)
+    newLine[1:] = (lineKey[1:] != lineKey[:-1]).any(axis=1)
+
+    starts = np.zeros(len(selected), np.int64)
+    starts[1:] = np.cumsum(lengths + 1)[:-1]
+    separators = np.where(newLine, '\n', ' ')
+    parts = [None] * (2 * len(selected))
+    parts[0::2] = separators.tolist()
+    parts[1::2] = texts.tolist()
+    return ''.join(parts[1:]), starts, starts + lengths, selected
+
+class Extractor:
+    """
+    Registro de padrões nomeados compilado em uma única expressão.
+
+    Uso:
+        extractor = Extractor()                      # todos os PATTERNS
+        dates = Extractor({'date': PATTERNS['date']})
+        for match in extractor.extract(result):
+            print(match['name'], match['value'], match['box'])
+    """
+
+    def __init__(self, patterns=None, flags=0):
+        """
+        Args:
+            patterns (dict[str, str] | None): Nome -> expressão regular. Se None, usa PATTERNS.
+            flags (int): Flags do módulo re aplicadas à expressão combinada.
+
+        Raises:
+            ValueError: Caso algum nome não seja um identificador válido ou a expressão não compile.
+        """
+        self.patterns = dict(PATTERNS if patterns is None else patterns)
+        self.flags = flags
+        self._compile()
+
+    def register(self, name, regex):
+        """
+        Adiciona (ou substitui) um padrão e recompila a expressão.
+
+        Args:
+            name (str): Nome do campo.
+            regex (str): Expressão regular.
+        """
+        self.patterns[name] = regex
+        self._compile()
+
+    def _compile(self):
+        for name in self.patterns:
+            if not name.isidentifier():
+                raise ValueError(f'Nome de padrão inválido: {name!r}')
+        try:
+            self.regex = re.compile(
+                '|'.join(f'(?P<{name}>{regex})' for name, regex in self.patterns.items()),
+                self.flags
+            )
+        except re.error as e:
+            raise ValueError(f'Padrão inválido: {e}') from None
+        self.names = list(self.patterns)
+
+    def findAll(self, text):
+        """
+        Procura todos os padrões em um texto qualquer, em uma única passada.
+
+        Args:
+            text (str): Texto a analisar.
+
+        Returns:
+            list[tuple[str, str, int, int]]: (nome, valor, início, fim) de cada ocorrência.
+        """
+        found = []
+        for match in self.regex.finditer(text):
+            name = match.lastgroup if match.lastgroup in self.patterns else next(
+                name for name in self.names if match.group(name) is not None
+            )
+            found.append((name, match.group(), match.start(), match.end()))
+        return found
+
+    def extract(self, result, minConfi=-1):
+        """
+        Extrai os campos da página e mapeia cada ocorrência para as palavras que cobre.
+
+        Args:
+            result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+            minConfi (int): Confiança mínima (exclusiva) das palavras consideradas.
+
+        Returns:
+            list[dict]: Uma entrada por ocorrência com 'name', 'value', 'words'
+            (índices no resultado) e 'box' ((left, top, width, height) que envolve as palavras).
+        """
+        table = OcrData.fromDict(result)
+        text, starts, ends, selected = pageText(table, minConfi)
+        matches = []
+        for name, value, start, end in self.findAll(text):
+            first = np.searchsorted(ends, start, 'right')
+            last = np.searchsorted(starts, end, 'left')
+            words = selected[first:last]
+            if not len(words):
+                continue
+            left = table['left'][words]
+            top = table['top'][words]
+            right = (left + table['width'][words]).max()
+            bottom = (top + table['height'][words]).max()
+            left, top = left.min(), top.min()
+            matches.append({
+                'name': name,
+                'value': value,
+                'words': words.tolist(),
+                'box': (int(left), int(top), int(right - left), int(bottom - top))
+            })
+        return matches
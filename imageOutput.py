@@ -0,0 +1,154 @@
+import os
+import threading
+import cv2 # OpenCV
+from concurrent.futures import ThreadPoolExecutor, wait as waitFutures
+from logUtils import getLogger
+
+"""
+Saída de imagens em arquivo, sem janela (modo headless).
+
+Substitui showImage/prepareWindow em servidores sem interface gráfica e no
+modo batch: as imagens (pré-processada, anotada) são codificadas em
+JPEG/PNG/WebP em um pool de threads, então a codificação roda em paralelo
+com o OCR da próxima imagem (o cv2.imwrite libera o GIL).
+
+Contém funções para:
+- Montar os parâmetros de codificação de cada formato
+- Gravar imagens em segundo plano, registrando as gravações que falharem
+"""
+
+logger = getLogger('imageOutput')
+
+FORMATS = ('jpg', 'png', 'webp')
+
+def encodeParams(format, quality):
+    """
+    Parâmetros do cv2.imwrite para o formato escolhido.
+
+    Args:
+        format (str): 'jpg', 'png' ou 'webp'.
+        quality (int): Qualidade de 0 a 100. No PNG (sem perdas) vira o nível de
+            compressão: 100 = mais rápido/maior arquivo, 0 = menor arquivo.
+
+    Raises:
+        ValueError: Caso o formato não seja suportado.
+
+    Returns:
+        list[int]: Parâmetros para cv2.imwrite.
+    """
+    quality = max(0, min(100, int(quality)))
+    if format == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, max(1, quality)]
+    if format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, round((100 - quality) * 9 / 100)]
+    raise ValueError(f'Formato inválido: {format}. Use um de {FORMATS}')
+
+class ImageWriter:
+    """
+    Grava imagens em um diretório usando um pool de threads.
+
+    Uso:
+        with ImageWriter('saida', format='webp', quality=80) as writer:
+            writer.save(img, 'frase.pre')
+    """
+
+    def __init__(self, directory, format='jpg', quality=90, workers=2):
+        """
+        Args:
+            directory (str): Diretório de saída (criado se não existir).
+            format (str): 'jpg', 'png' ou 'webp'.
+            quality (int): Qualidade de 0 a 100 (ver encodeParams).
+            workers (int): Número de threads de codificação.
+        """
+        self.directory = directory
+        self.format = format
+        self.params = encodeParams(format, quality)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ImageWriter')
+        self.pending = set()
+        # exceções das gravações que falharam, ainda não informadas por wait/close
+        self.errors = []
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def path(self, name):
+        """
+        Args:
+            name (str): Nome do arquivo sem extensão.
+
+        Returns:
+            str: Caminho final do arquivo.
+        """
+        return os.path.join(self.directory, f'{name}.{self.format}')
+
+    def save(self, image, name, copy=True):
+        """
+        Agenda a gravação de uma imagem.
+
+        Args:
+            image (numpy.ndarray): Imagem (BGR ou escala de cinza).
+            name (str): Nome do arquivo sem extensão.
+            copy (bool): Se deve copiar a imagem antes de agendar. Use False só se
+                o array não for mais alterado (ex: buffers do pipeline são reaproveitados).
+
+        Returns:
+            concurrent.futures.Future: Future com o caminho gravado.
+        """
+        if copy:
+            image = image.copy()
+        future = self.executor.submit(self._write, image, self.path(name))
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def wait(self):
+        """
+        Aguarda as gravações pendentes.
+
+        Raises:
+            OSError: Caso alguma gravação tenha falhado desde a última chamada
+                (a primeira falha é propagada).
+        """
+        with self.lock:
+            pending = list(self.pending)
+        waitFutures(pending)
+        errors = self._takeErrors()
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """
+        Aguarda as gravações pendentes, encerra as threads e registra no log as falhas.
+
+        Returns:
+            list[Exception]: Falhas de gravação ainda não informadas por wait.
+        """
+        self.executor.shutdown(wait=True)
+        errors = self._takeErrors()
+        for error in errors:
+            logger.error('ImageWriter - %s', error)
+        return errors
+
+    def _takeErrors(self):
+        with self.lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                self.errors.append(future.exception())
+
+    def _write(self, image, path):
+        if not cv2.imwrite(path, image, self.params):
+            raise OSError(f'Não foi possível gravar a imagem: {path}')
+        return path
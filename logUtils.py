@@ -0,0 +1,131 @@
+import logging
+import sys
+import numpy as np
+from ocrData import OcrData
+
+"""
+Camada de log do projeto, sobre o módulo logging da biblioteca padrão.
+
+Substitui os print de depuração espalhados pelos módulos. As mensagens usam
+formatação tardia (logger.debug('limiar=%s', valor)): nada é formatado se o
+nível não estiver habilitado. Arrays e resultados do Tesseract são passados
+embrulhados em ArraySummary / DataSummary, que só calculam o resumo (forma,
+tipo e estatísticas) quando a mensagem é de fato emitida, em vez de
+converter o conteúdo inteiro em texto.
+
+As mensagens vão para stderr, então não se misturam à saída JSON Lines do
+modo batch.
+
+Contém funções para:
+- Obter o logger de cada módulo
+- Configurar o nível e o destino das mensagens
+- Resumir arrays e resultados do image_to_data sob demanda
+"""
+
+ROOT = 'ocr'
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+FORMAT = '%(asctime)s %(levelname)s %(name)s - %(message)s'
+
+def getLogger(name):
+    """
+    Args:
+        name (str): Nome do módulo (ex: 'preprocessing').
+
+    Returns:
+        logging.Logger: Logger 'ocr.<name>', controlado por configureLogging.
+    """
+    return logging.getLogger(f'{ROOT}.{name}')
+
+def configureLogging(level='WARNING', stream=None):
+    """
+    Define o nível das mensagens do projeto e para onde elas vão.
+
+    Pode ser chamada mais de uma vez: o handler é criado uma única vez e só o
+    nível (e o destino, se informado) é atualizado.
+
+    Args:
+        level (str | int): 'DEBUG', 'INFO', 'WARNING', 'ERROR' ou 'CRITICAL' (ou a constante do logging).
+        stream (io.TextIOBase | None): Destino das mensagens (padrão: sys.stderr).
+
+    Raises:
+        ValueError: Caso o nível seja inválido.
+    """
+    if isinstance(level, str):
+        if level.upper() not in LEVELS:
+            raise ValueError(f'Nível de log inválido: {level}. Use um de {LEVELS}')
+        level = level.upper()
+    logger = logging.getLogger(ROOT)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = next((handler for handler in logger.handlers if getattr(handler, '_ocrHandler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        handler._ocrHandler = True
+        logger.addHandler(handler)
+    elif stream is not None:
+        handler.setStream(stream)
+
+def currentLevel():
+    """
+    Returns:
+        str: Nível efetivo das mensagens do projeto (ex: 'WARNING').
+    """
+    return logging.getLevelName(logging.getLogger(ROOT).getEffectiveLevel())
+
+class ArraySummary:
+    """
+    Resumo de um numpy.ndarray calculado só quando a mensagem é formatada.
+
+    Uso:
+        logger.debug('erosão - %s', ArraySummary(erosion))
+        # ndarray(shape=(400, 590), dtype=uint8, min=0, max=255, mean=213.41)
+    """
+
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        """
+        Args:
+            array (numpy.ndarray): Array resumido (não é copiado).
+        """
+        self.array = array
+
+    def __str__(self):
+        array = self.array
+        if not isinstance(array, np.ndarray):
+            return f'{type(array).__name__}'
+        parts = [f'shape={array.shape}', f'dtype={array.dtype}']
+        if array.size and (np.issubdtype(array.dtype, np.number) or array.dtype == np.bool_):
+            parts.append(f'min={array.min()}')
+            parts.append(f'max={array.max()}')
+            parts.append(f'mean={float(array.mean()):.2f}')
+        return f'ndarray({", ".join(parts)})'
+
+    __repr__ = __str__
+
+class DataSummary:
+    """
+    Resumo de um resultado do image_to_data calculado só quando a mensagem é formatada.
+
+    Uso:
+        logger.debug('ImageData - %s', DataSummary(result))
+        # image_to_data(rows=58, words=41, conf=87.32)
+    """
+
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        """
+        Args:
+            result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+        """
+        self.result = result
+
+    def __str__(self):
+        table = OcrData.fromDict(self.result)
+        conf = table['conf'][table.words() & table.nonEmpty() & (table['conf'] >= 0)]
+        meanConf = f'{float(conf.mean()):.2f}' if len(conf) else '-'
+        return f'image_to_data(rows={len(table)}, words={len(conf)}, conf={meanConf})'
+
+    __repr__ = __str__
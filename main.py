@@ -1,36 +1,71 @@
 from tesseractUtils import *
 from preprocessing import *
 from pytesseract import TesseractError
-import numpy as np
+from pytesseract.pytesseract import osd_to_dict
+from workerFarm import OcrWorkerFarm
+from pipeline import PreprocessingPipeline
+from imageOutput import ImageWriter, FORMATS
+from cascade import OcrCascade
+from race import OcrRace, SCORES, loadDictionary
+from logUtils import getLogger, configureLogging, DataSummary, LEVELS
+from ocrServer import OcrService, serve as serveHttp, DEFAULT_MAX_UPLOAD
+import argparse
+import glob
+import json
+import os
+import sys
 
 """
 Módulo principal para execução de OCR com Tesseract e pré-processamento de imagens.
 
 Contém funções para:
-- Detectar orientação de imagens
+- Detectar e corrigir a orientação de imagens
 - Desenhar caixas em textos detectados
-- Pré-processamento avançado ou simples
-- Remoção de ruído
+- Pré-processamento avançado, simples ou por pipeline declarativo (JSON/YAML)
 - Execução do fluxo principal de OCR
+- Modo batch (linha de comando) para processar uma pasta inteira em paralelo
+- Modo headless: imagens gravadas em arquivo em vez de exibidas em janela
+- Modo serviço: servidor HTTP local com fila limitada (ver ocrServer.py)
 """
 
-def imageOrientation(pathImagem):
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp')
+
+logger = getLogger('main')
+
+def imageOrientation(image, config_tesseract='', minConfidence=0.3):
     """
-    Detecta e exibe a orientação da imagem usando Tesseract OSD.
+    Detecta a orientação da imagem e retorna o giro que a deixa em pé.
+
+    A estimativa é feita por estimateOrientation (sem processo do Tesseract); o
+    OSD do Tesseract só é chamado se a confiança ficar abaixo de minConfidence.
 
     Args:
-        pathImagem (str): Caminho da imagem a ser processada.
+        image (str | LoadedImage): Caminho da imagem ou imagem já decodificada
+            (usa os pixels BGR direto, a orientação não depende da ordem dos canais).
+        config_tesseract (str): Configurações Tesseract usadas pelo OSD (ex: '--tessdata-dir tessdata').
+        minConfidence (float): Confiança mínima (0 a 1) para dispensar o OSD.
+
+    Returns:
+        float: Rotação anti-horária em graus a aplicar com rotate (0 se não for possível decidir).
 
     Notes:
-        Se houver erro no Tesseract, exibe mensagem de aviso.
+        Se houver erro no Tesseract, exibe mensagem de aviso e não gira a imagem.
     """
+    img = (image if isinstance(image, LoadedImage) else loadImage(image)).bgr
+    estimate = estimateOrientation(img)
+    logger.info('imageOrientation - %s', estimate)
+    if estimate['confidence'] >= minConfidence:
+        return estimate['angle']
     try:
-        img = readImageWithPIL(pathImagem)
-        print(f'imageOrientation - {imageToOsd(img)}', end='\n\n')
-    except TesseractError:
-        print(f'imageOrientation - Erro no Tesseract, por favor olhar depois', end='\n\n')
-
-def drawBox(config, img):
+        osd = osd_to_dict(imageToOsd(img, config_tesseract))
+    except (TesseractError, OSError):
+        logger.warning('imageOrientation - Erro no Tesseract, por favor olhar depois')
+        return 0.0
+    logger.info('imageOrientation - OSD %s', osd)
+    # 'Rotate' do OSD é o giro horário que deixa o texto em pé; rotate gira no sentido anti-horário
+    return -float(osd['rotate'])
+
+def drawBox(config, img, result=None, level='word', writer=None):
     """
     Desenha caixas em torno de textos detectados pela função Tesseract image_to_data
     e exibe a imagem resultante.
@@ -38,118 +73,312 @@ def drawBox(config, img):
     Args:
         config (str): Configurações do Tesseract (ex: '--tessdata-dir tessdata').
         img (numpy.ndarray): Imagem a ser processada.
+        result (dict | OcrData | None): Resultado já calculado de image_to_data. Se None, executa o Tesseract.
+        level (str): Nível das caixas ('word', 'line', 'paragraph' ou 'block').
+        writer (ImageWriter | None): Se informado, grava a imagem anotada ('box') em
+            vez de abrir uma janela.
     """
     minConfi = 40
 
-    result = imageToData(
-        img, 
-        'por', 
-        config
-    )
-
-    print(f'ImageData - {result}', end='\n\n')
-    data, imgCopy = travelImage(img.copy(), result, minConfi, 1)
-    showImage(imgCopy)
-    print(f'Resultado da busca: {data}', end='\n\n')
-
-def removeNoise(gray):
-    """
-    Remove ruído da imagem aplicando técnicas de dilatação e erosão.
-    Pode utilizar a tecnica de ABERTURA para ruidos fora do texto.
-    Pode utilizar a tecnica de FECHAMENTO para ruidos dentro do texto.
-
-    Args:
-        gray (numpy.ndarray): Imagem em tons de cinza ou binarizada.
-
-    Returns:
-        numpy.ndarray: Imagem processada com ruído reduzido.
-    """
-    matriz = np.ones((5, 5), np.uint8)
-
-    # Abertura
-    # gray = removeNoiseErosionTechnique(gray, matriz)
-    # gray = removeNoiseDilationTechnique(gray, matriz)
-
-    # Fechamento
-    gray = removeNoiseDilationTechnique(gray, matriz)
-    gray = removeNoiseErosionTechnique(gray, matriz)
+    if result is None:
+        result = imageToData(
+            img, 
+            'por', 
+            config
+        )
+
+    logger.debug('ImageData - %s', DataSummary(result))
+    data, imgCopy = travelImage(img.copy(), result, minConfi, 1, level=level)
+    if writer is not None:
+        writer.save(imgCopy, 'box', copy=False)
+    else:
+        showImage(imgCopy)
+    logger.info('Resultado da busca: %s', data)
 
-    return gray
+# Pipelines padrão (ver pipeline.py). Exemplo de pipeline avançado completo:
+# ['grayscale', {'step': 'binarizationOtsu'}, 'colorInversion',
+#  'autoResize',
+#  'removeNoise', 'blurByMedia']
+ADVANCED_PIPELINE = PreprocessingPipeline(['grayscale'])
+SIMPLE_PIPELINE = PreprocessingPipeline(['convertBGRtoRGB'])
 
-def preProcessing(img, advancedProcessing):
+def preProcessing(img, advancedProcessing, pipeline=None):
     """
     Aplica pré-processamento na imagem antes do OCR.
 
     Args:
         img (numpy.ndarray): Imagem original.
         advancedProcessing (bool): Indica se deve usar processamento avançado (binarização, remoção de ruído, etc.).
+        pipeline (PreprocessingPipeline | None): Pipeline a aplicar no lugar dos padrões
+            ADVANCED_PIPELINE / SIMPLE_PIPELINE.
 
     Returns:
         numpy.ndarray: Imagem pré-processada para OCR.
     """
-    if advancedProcessing:
-        img = grayscale(img)
-
-        """binarization"""
-        # img = binarizationSimple(img, 140, 255)
-        # img = binarizationOtsu(img)
-        # img = binarizationAdaptive(img)
-        # img = binarizationAdaptiveGaussiana(img)
-
-        """color inversion"""
-        # img = colorInversion(img)
-
-        """resizing"""
-        # img = resizing(img, 1.5, 1.5, cv2.INTER_CUBIC)
-
-        """removeNoise"""
-        # img = removeNoise(img)
-
-        """blur"""
-        # img = blur(img)
-        # img = blurByGaussian(img)
-        # img = blurByMedia(img)
-        # img = bilateralBlur(img)
-    else:
-        img = convertBGRtoRGB(img)
-    return img
+    if pipeline is None:
+        pipeline = ADVANCED_PIPELINE if advancedProcessing else SIMPLE_PIPELINE
+    return pipeline(img)
 
 def main():
     """
     Fluxo principal de execução do OCR:
-    - Configura o caminho do Tesseract
+    - Configura o caminho do Tesseract e a engine ('cli' ou 'capi')
     - Define opções de visualização e pré-processamento
     - Lê a imagem
+    - Endireita a orientação (0/90/180/270 e inclinação) quando a estimativa é confiável
     - Aplica pré-processamento
     - Exibe a imagem (opcional)
+    - Extrai texto e dados em uma única passada do Tesseract
     - Desenha caixas sobre textos detectados (opcional)
-    - Extrai texto usando Tesseract
     """
     pytesseract.pytesseract.tesseract_cmd = r"C:\Development Environment\Tesseract-OCR\tesseract.exe"
+    # 'capi' mantém o Tesseract carregado em processo (requer libtesseract, ver TESSERACT_LIB)
+    setEngine('cli')
     viewImage = True
     viewImageWithBox = True
+    # diretório para gravar as imagens em vez de abrir janelas (servidores sem interface gráfica)
+    outputDir = None
+
+    # 'DEBUG' mostra limiares e resumos das imagens/resultados; 'INFO' só orientação e busca
+    configureLogging('DEBUG')
 
     advancedProcessing = True
+    # caminho de um pipeline JSON/YAML (ver pipeline.py); None usa o padrão de advancedProcessing
+    pipelineSpec = None
 
     pathImage = 'img\\frase.jpg'
 
     # config = '--tessdata-dir tessdata --psm 9'
     config = '--tessdata-dir tessdata'
 
-    imageOrientation(pathImage)
+    image = loadImage(pathImage)
 
-    img = readImageWithOpenCV(pathImage)
+    # orientação estimada sem OSD (o Tesseract só é chamado se a confiança for baixa)
+    angle = imageOrientation(image, config)
 
-    img = preProcessing(img, advancedProcessing)
+    pipeline = PreprocessingPipeline.load(pipelineSpec) if pipelineSpec else None
+    img = preProcessing(rotate(image.bgr, angle) if angle else image.bgr, advancedProcessing, pipeline)
+
+    writer = ImageWriter(outputDir) if outputDir else None
 
     if viewImage:
-        img = prepareWindow(img)
-        showImage(img)
+        if writer is not None:
+            writer.save(img, 'pre')
+        else:
+            img = prepareWindow(img)
+            showImage(img)
+
+    # o texto é reconstruído dos dados por palavra (dataToString), sem pedir o .txt ao Tesseract
+    result = imageToAll(img, 'por', config, osd=False, text=False)
+
     if viewImageWithBox and not advancedProcessing:
-        drawBox(config, img)
+        drawBox(config, img, result['data'], writer=writer)
 
-    print(f'Text to String:\n {imageToString(img,'por',config)}', end='\n\n')
+    print(f'Text to String:\n {result["text"]}', end='\n\n')
+    if writer is not None:
+        writer.close()
     
+def listImages(source):
+    """
+    Lista as imagens de uma pasta ou de um padrão glob.
+
+    Args:
+        source (str): Pasta (ex: 'img') ou padrão glob (ex: 'img/livro*.jpg').
+
+    Returns:
+        list[str]: Caminhos das imagens em ordem alfabética.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path))
+
+def buildPreprocess(args):
+    """
+    Monta o pré-processamento pedido na linha de comando.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        PreprocessingPipeline: Pipeline serializável para a OcrWorkerFarm. O padrão também
+        é um pipeline, para que os passos (describe) entrem na chave do cache.
+    """
+    if args.pipeline:
+        return PreprocessingPipeline.load(args.pipeline, args.reuse_buffers, args.tile_size)
+    return PreprocessingPipeline(
+        (ADVANCED_PIPELINE if args.advanced else SIMPLE_PIPELINE).spec,
+        args.reuse_buffers,
+        args.tile_size
+    )
+
+def buildStrategy(args):
+    """
+    Monta a estratégia de OCR (cascata ou corrida) pedida na linha de comando.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        OcrCascade | OcrRace | None: Estratégia, ou None para o OCR simples.
+    """
+    if args.cascade or args.cascade_tiers:
+        return OcrCascade(args.cascade_tiers, args.cascade_threshold, args.reuse_buffers)
+    if args.race or args.race_candidates:
+        return OcrRace(
+            args.race_candidates,
+            args.race_score,
+            loadDictionary(args.race_dictionary) if args.race_dictionary else None,
+            args.race_stop_at,
+            args.race_workers
+        )
+    return None
+
+def batch(args):
+    """
+    Executa o OCR em todas as imagens de uma pasta/glob usando a fazenda de processos
+    e escreve uma linha JSON por imagem (JSON Lines).
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: Código de saída (1 se alguma imagem falhar).
+    """
+    configureLogging(args.log_level)
+    paths = listImages(args.batch)
+    preprocess = buildPreprocess(args)
+    strategy = buildStrategy(args)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failures = 0
+    try:
+        with OcrWorkerFarm(
+            workers=args.workers,
+            preprocess=preprocess,
+            lang=args.lang,
+            config=args.config,
+            engine=args.engine,
+            osd=args.osd,
+            timeout=args.timeout,
+            tesseractCmd=args.tesseract_cmd,
+            cacheEntries=args.cache_entries,
+            cacheDir=args.cache_dir,
+            outputDir=args.save_dir,
+            outputFormat=args.save_format,
+            outputQuality=args.save_quality,
+            annotate=args.annotate,
+            logLevel=args.log_level,
+            strategy=strategy
+        ) as farm:
+            for result in farm.map(paths, ordered=args.ordered):
+                line = {
+                    'path': result['path'],
+                    'text': result['text'],
+                    'words': wordBoxes(result['data']) if result['data'] else [],
+                    'osd': result['osd'],
+                    'timings': result['timings'],
+                    'cache': result['cache']['status'] if result['cache'] else None,
+                    'outputs': result['outputs'],
+                    'tier': result['cascade']['tier'] if result['cascade'] else None,
+                    'winner': result['race']['winner'] if result['race'] else None,
+                    'confidence': (result['cascade'] or result['race'] or {}).get('confidence'),
+                    'error': result['error']
+                }
+                failures += result['error'] is not None
+                out.write(json.dumps(line, ensure_ascii=False) + '\n')
+                out.flush()
+            if args.cache_entries or args.cache_dir:
+                logger.info('batch - cache - %s', farm.cacheStats())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+def service(args):
+    """
+    Sobe o serviço HTTP de OCR (ver ocrServer.py) com as mesmas opções de
+    pré-processamento, estratégia e Tesseract do modo batch.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+
+    Returns:
+        int: Código de saída.
+    """
+    configureLogging(args.log_level)
+    with OcrWorkerFarm(
+        workers=args.workers,
+        preprocess=buildPreprocess(args),
+        lang=args.lang,
+        config=args.config,
+        engine=args.engine,
+        osd=args.osd,
+        timeout=args.timeout,
+        tesseractCmd=args.tesseract_cmd,
+        cacheEntries=args.cache_entries,
+        cacheDir=args.cache_dir,
+        logLevel=args.log_level,
+        strategy=buildStrategy(args)
+    ) as farm:
+        serveHttp(OcrService(farm, args.queue_size, maxUpload=args.max_upload), args.host, args.port)
+        farm.close(cancelPending=True)
+    return 0
+
+def parseArgs(argv=None):
+    """
+    Lê os argumentos da linha de comando.
+
+    Sem '--batch' ou '--serve' o fluxo interativo de main() é executado.
+
+    Args:
+        argv (list[str] | None): Argumentos (padrão: sys.argv).
+
+    Returns:
+        argparse.Namespace: Argumentos lidos.
+    """
+    parser = argparse.ArgumentParser(description='OCR com Tesseract e pré-processamento de imagens.')
+    parser.add_argument('--batch', metavar='PASTA_OU_GLOB', help="pasta ou glob de imagens (ex: img ou 'img/*.jpg')")
+    parser.add_argument('--serve', action='store_true', help='sobe o serviço HTTP de OCR (POST /ocr, /healthz, /readyz, /queue)')
+    parser.add_argument('--host', default='127.0.0.1', help='endereço do serviço HTTP')
+    parser.add_argument('--port', type=int, default=8080, help='porta do serviço HTTP')
+    parser.add_argument('--queue-size', type=int, default=None, help='jobs aguardando além dos em execução; acima disso responde 503 (padrão: 2 por processo)')
+    parser.add_argument('--max-upload', type=int, default=DEFAULT_MAX_UPLOAD, help='tamanho máximo da imagem enviada, em bytes')
+    parser.add_argument('--output', '-o', help='arquivo JSON Lines de saída (padrão: stdout)')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='número de processos (padrão: núcleos da CPU)')
+    parser.add_argument('--lang', default='por', help='idioma do Tesseract')
+    parser.add_argument('--config', default='--tessdata-dir tessdata', help='configurações do Tesseract')
+    parser.add_argument('--engine', choices=ENGINES, default='cli', help='engine do Tesseract')
+    parser.add_argument('--advanced', action='store_true', help='usa o pré-processamento avançado')
+    parser.add_argument('--pipeline', metavar='ARQUIVO_OU_JSON', help='pipeline de pré-processamento em JSON/YAML (substitui --advanced)')
+    parser.add_argument('--reuse-buffers', action='store_true', help='reaproveita os buffers do pré-processamento entre imagens (menos alocações)')
+    parser.add_argument('--tile-size', type=int, default=None, help='executa blur, bilateral, morfologia e binarização adaptativa em blocos desse lado, em paralelo')
+    parser.add_argument('--osd', action='store_true', help='detecta a orientação de cada imagem')
+    parser.add_argument('--ordered', action='store_true', help='mantém a ordem das imagens na saída')
+    parser.add_argument('--timeout', type=float, default=None, help='tempo máximo por imagem em segundos')
+    parser.add_argument('--tesseract-cmd', default=None, help='caminho do executável tesseract')
+    parser.add_argument('--cache-entries', type=int, default=0, help='tamanho do cache em memória por processo (0 = desligado)')
+    parser.add_argument('--cache-dir', default=None, help='diretório do cache persistente de resultados')
+    parser.add_argument('--cascade', action='store_true', help='OCR em cascata: pré-processamento mais pesado só quando a confiança fica abaixo do alvo')
+    parser.add_argument('--cascade-threshold', type=float, default=70, help='confiança média alvo da cascata (0 a 100)')
+    parser.add_argument('--cascade-tiers', metavar='ARQUIVO_OU_JSON', default=None, help='lista de pipelines da cascata, do mais leve ao mais pesado (liga --cascade)')
+    parser.add_argument('--race', action='store_true', help='roda vários pré-processamentos em paralelo e fica com o melhor resultado')
+    parser.add_argument('--race-candidates', metavar='ARQUIVO_OU_JSON', default=None, help='lista de pipelines candidatos (liga --race)')
+    parser.add_argument('--race-score', choices=SCORES, default='confidence', help='critério de escolha do vencedor')
+    parser.add_argument('--race-dictionary', default=None, help='dicionário (uma palavra por linha) para --race-score words')
+    parser.add_argument('--race-stop-at', type=float, default=90, help='confiança que encerra a corrida cancelando os candidatos restantes')
+    parser.add_argument('--race-workers', type=int, default=None, help='threads da corrida em cada processo')
+    parser.add_argument('--save-dir', default=None, help='grava a imagem pré-processada de cada job neste diretório')
+    parser.add_argument('--save-format', choices=FORMATS, default='jpg', help='formato das imagens gravadas')
+    parser.add_argument('--save-quality', type=int, default=90, help='qualidade das imagens gravadas (0 a 100)')
+    parser.add_argument('--log-level', choices=LEVELS, default='INFO', help='nível das mensagens de log (em stderr)')
+    parser.add_argument('--annotate', action='store_true', help='grava também a imagem com as caixas das palavras (requer --save-dir)')
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parseArgs()
+    if args.batch:
+        sys.exit(batch(args))
+    if args.serve:
+        sys.exit(service(args))
     main()
\ No newline at end of file
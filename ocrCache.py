@@ -0,0 +1,217 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import functools
+import numpy as np
+from collections import OrderedDict
+
+"""
+Cache de resultados de OCR endereçado por conteúdo.
+
+A chave é um hash dos pixels decodificados somado ao idioma, à string de
+configuração do Tesseract e às configurações de pré-processamento, então
+reenvios, duplicatas e reprocessamentos de um lote não pagam o OCR de novo.
+
+Contém funções para:
+- Gerar a chave de cache de uma imagem
+- Descrever de forma estável as configurações de pré-processamento
+- Guardar resultados em memória (LRU com limite) e em disco (persistente)
+"""
+
+def describeSettings(value):
+    """
+    Gera uma descrição estável (igual entre processos e execuções) das configurações.
+
+    Funções viram 'modulo.nome', functools.partial inclui os argumentos e objetos
+    com o método describe() usam a própria descrição.
+
+    Args:
+        value (object): Configuração de pré-processamento (callable, partial, dict, etc.).
+
+    Returns:
+        str: Descrição estável.
+    """
+    if value is None:
+        return 'None'
+    if hasattr(value, 'describe'):
+        return value.describe()
+    if isinstance(value, functools.partial):
+        args = ', '.join(describeSettings(arg) for arg in value.args)
+        kwargs = ', '.join(f'{k}={describeSettings(v)}' for k, v in sorted(value.keywords.items()))
+        return f'partial({describeSettings(value.func)}; {args}; {kwargs})'
+    if callable(value) and hasattr(value, '__qualname__'):
+        return f'{value.__module__}.{value.__qualname__}'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{k!r}: {describeSettings(v)}' for k, v in sorted(value.items())) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(describeSettings(v) for v in value) + ']'
+    return repr(value)
+
+def makeKey(image, lang, config_tesseract, settings=None):
+    """
+    Calcula a chave de cache de uma imagem.
+
+    Args:
+        image (numpy.ndarray): Pixels decodificados (antes do pré-processamento).
+        lang (str): Código do idioma.
+        config_tesseract (str): Configurações Tesseract.
+        settings (object): Configurações de pré-processamento e demais opções que
+            alteram o resultado (ver describeSettings).
+
+    Returns:
+        str: Chave hexadecimal.
+    """
+    pixels = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{pixels.shape}|{pixels.dtype}|'.encode())
+    digest.update(pixels.data)
+    digest.update(f'|{lang}|{config_tesseract}|{describeSettings(settings)}'.encode())
+    return digest.hexdigest()
+
+class OcrCache:
+    """
+    Cache em dois níveis: LRU em memória com limite de entradas e, opcionalmente,
+    um diretório em disco que sobrevive a reinícios.
+
+    Os valores são serializados com pickle no disco, então o diretório deve
+    ser confiável (apenas local).
+
+    Thread-safe. Vários processos podem compartilhar o mesmo diretório, pois
+    as gravações são atômicas.
+    """
+
+    def __init__(self, maxEntries=256, directory=None):
+        """
+        Args:
+            maxEntries (int): Número máximo de resultados em memória (0 = só o disco).
+            directory (str | None): Diretório do nível em disco. Se None, só usa memória.
+        """
+        self.maxEntries = maxEntries
+        self.directory = directory
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'memoryHits': 0, 'diskHits': 0, 'misses': 0, 'evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """
+        Busca um resultado, primeiro na memória e depois no disco.
+
+        Args:
+            key (str): Chave gerada por makeKey.
+
+        Returns:
+            object | None: Resultado guardado ou None.
+        """
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """
+        Igual a get, mas informa também de qual nível o resultado veio.
+
+        Args:
+            key (str): Chave gerada por makeKey.
+
+        Returns:
+            tuple[object | None, str | None]: Resultado e nível ('memory', 'disk' ou None).
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counters['hits'] += 1
+                self.counters['memoryHits'] += 1
+                return self.memory[key], 'memory'
+
+        value = self._readDisk(key)
+        with self.lock:
+            if value is None:
+                self.counters['misses'] += 1
+                return None, None
+            self.counters['hits'] += 1
+            self.counters['diskHits'] += 1
+            self._putMemory(key, value)
+        return value, 'disk'
+
+    def put(self, key, value):
+        """
+        Guarda um resultado na memória e no disco.
+
+        Args:
+            key (str): Chave gerada por makeKey.
+            value (object): Resultado serializável com pickle.
+        """
+        with self.lock:
+            self._putMemory(key, value)
+        self._writeDisk(key, value)
+
+    def getOrCompute(self, key, compute):
+        """
+        Retorna o resultado guardado ou calcula, guarda e retorna.
+
+        Args:
+            key (str): Chave gerada por makeKey.
+            compute (callable): Função sem argumentos que calcula o resultado.
+
+        Returns:
+            tuple[object, bool]: Resultado e se veio do cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def stats(self):
+        """
+        Returns:
+            dict: Contadores de acertos (memória/disco), faltas e remoções, e o tamanho atual.
+        """
+        with self.lock:
+            return dict(self.counters, entries=len(self.memory))
+
+    def clear(self):
+        """
+        Esvazia o nível em memória (o disco é mantido).
+        """
+        with self.lock:
+            self.memory.clear()
+
+    def _putMemory(self, key, value):
+        if self.maxEntries <= 0:
+            # só disco: nada entra (nem sai) da memória, e os contadores ficam limpos
+            return
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxEntries:
+            self.memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _diskPath(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.pkl')
+
+    def _readDisk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._diskPath(key), 'rb') as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _writeDisk(self, key, value):
+        if not self.directory:
+            return
+        path = self._diskPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tempPath, path)
+        except BaseException:
+            os.remove(tempPath)
+            raise
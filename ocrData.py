@@ -0,0 +1,176 @@
+import numpy as np
+
+"""
+Resultado de image_to_data em formato colunar (arrays numpy).
+
+O dict do pytesseract (Output.DICT) guarda uma lista Python por coluna e
+obriga quem consome a percorrer palavra por palavra chamando int(), isspace()
+e len(). Aqui cada coluna vira um array e as seleções (confiança, texto vazio,
+bloco, linha, região) são máscaras booleanas calculadas de uma vez.
+
+Contém funções para:
+- Converter o dict de image_to_data em colunas numpy (e de volta)
+- Gerar máscaras vetorizadas de filtragem
+- Selecionar subconjuntos de palavras
+"""
+
+INT_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height', 'conf')
+WORD_LEVEL = 5
+
+class OcrData:
+    """
+    Colunas de image_to_data como arrays numpy.
+
+    As colunas numéricas são int32 e 'text' é um array de strings de tamanho
+    fixo. A indexação por nome de coluna (data['left'], data['text']) funciona
+    como no dict do pytesseract, então funções como textBox aceitam os dois.
+
+    Uso:
+        table = OcrData.fromDict(result)
+        mask = table.confident(40) & table.nonEmpty()
+        for i in table.indices(mask):
+            ...
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns (dict[str, numpy.ndarray]): Colunas já convertidas, todas com o mesmo tamanho.
+        """
+        self.columns = columns
+        self._nonEmpty = None
+
+    @classmethod
+    def fromDict(cls, result):
+        """
+        Converte o resultado de image_to_data (Output.DICT).
+
+        Args:
+            result (dict | OcrData): Resultado do Tesseract. Um OcrData é devolvido sem cópia.
+
+        Returns:
+            OcrData: Tabela colunar.
+        """
+        if isinstance(result, OcrData):
+            return result
+        size = len(result.get('text', ()))
+        columns = {}
+        for name in INT_COLUMNS:
+            values = result.get(name)
+            columns[name] = np.asarray(values, dtype=np.int32) if values is not None else np.zeros(size, np.int32)
+        columns['text'] = np.asarray(result.get('text', []), dtype=str)
+        return cls(columns)
+
+    def toDict(self):
+        """
+        Returns:
+            dict: Mesmo formato do Output.DICT do pytesseract (listas de int e str).
+        """
+        return {name: column.tolist() for name, column in self.columns.items()}
+
+    def __len__(self):
+        return len(self.columns['text'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+    def words(self):
+        """
+        Returns:
+            numpy.ndarray: Máscara das linhas de nível palavra (level 5).
+        """
+        return self.columns['level'] == WORD_LEVEL
+
+    def nonEmpty(self):
+        """
+        Returns:
+            numpy.ndarray: Máscara das linhas com texto que não é vazio nem só espaços.
+        """
+        if self._nonEmpty is None:
+            self._nonEmpty = np.char.str_len(np.char.strip(self.columns['text'])) > 0
+        return self._nonEmpty
+
+    def confident(self, minConfi):
+        """
+        Args:
+            minConfi (int): Confiança mínima (exclusiva, como em travelImage).
+
+        Returns:
+            numpy.ndarray: Máscara das linhas com conf > minConfi.
+        """
+        return self.columns['conf'] > minConfi
+
+    def inBlock(self, block, page=None):
+        """
+        Args:
+            block (int): Número do bloco.
+            page (int | None): Número da página (None = qualquer).
+
+        Returns:
+            numpy.ndarray: Máscara das linhas do bloco.
+        """
+        mask = self.columns['block_num'] == block
+        if page is not None:
+            mask &= self.columns['page_num'] == page
+        return mask
+
+    def inLine(self, block, par, line, page=None):
+        """
+        Args:
+            block (int): Número do bloco.
+            par (int): Número do parágrafo dentro do bloco.
+            line (int): Número da linha dentro do parágrafo.
+            page (int | None): Número da página (None = qualquer).
+
+        Returns:
+            numpy.ndarray: Máscara das linhas (palavras) daquela linha de texto.
+        """
+        mask = self.inBlock(block, page)
+        mask &= self.columns['par_num'] == par
+        mask &= self.columns['line_num'] == line
+        return mask
+
+    def inRegion(self, x, y, w, h, contained=False):
+        """
+        Args:
+            x (int): Posição horizontal da região.
+            y (int): Posição vertical da região.
+            w (int): Largura da região.
+            h (int): Altura da região.
+            contained (bool): Se True, a caixa precisa estar inteira dentro da
+                região; se False, basta encostar nela.
+
+        Returns:
+            numpy.ndarray: Máscara das caixas na região.
+        """
+        left, top = self.columns['left'], self.columns['top']
+        right, bottom = left + self.columns['width'], top + self.columns['height']
+        if contained:
+            return (left >= x) & (top >= y) & (right <= x + w) & (bottom <= y + h)
+        return (left < x + w) & (right > x) & (top < y + h) & (bottom > y)
+
+    def indices(self, mask):
+        """
+        Args:
+            mask (numpy.ndarray): Máscara booleana.
+
+        Returns:
+            numpy.ndarray: Índices das linhas selecionadas.
+        """
+        return np.flatnonzero(mask)
+
+    def select(self, mask):
+        """
+        Args:
+            mask (numpy.ndarray): Máscara booleana ou array de índices.
+
+        Returns:
+            OcrData: Nova tabela só com as linhas selecionadas.
+        """
+        return OcrData({name: column[mask] for name, column in self.columns.items()})
@@ -0,0 +1,369 @@
+import base64
+import json
+import math
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from imageOutput import FORMATS
+from logUtils import getLogger
+from tesseractUtils import wordBoxes
+
+"""
+Serviço HTTP local de OCR sobre a OcrWorkerFarm.
+
+Recebe imagens por POST e devolve o texto, as palavras com caixas e, se
+pedido, a imagem anotada. Os jobs vão para processos já aquecidos (engine,
+traineddata e cache carregados antes da primeira requisição) através de uma
+fila limitada: com todos os processos ocupados e a fila cheia, a requisição
+é recusada na hora com 503 e Retry-After, sem ler o corpo, em vez de
+acumular imagens na memória.
+
+Endpoints:
+- POST /ocr          corpo com a imagem (bytes crus ou multipart/form-data, campo 'image');
+                     ?annotate=1 devolve a imagem anotada em base64 (&format=jpg|png|webp)
+- GET  /healthz      processo vivo (liveness)
+- GET  /readyz       200 se os processos estão aquecidos e há vaga, senão 503
+- GET  /queue        ocupação da fila e contadores
+
+Contém funções para:
+- Controlar as vagas da fila e estimar o Retry-After
+- Tratar as requisições HTTP
+- Criar e executar o servidor
+"""
+
+logger = getLogger('ocrServer')
+
+DEFAULT_MAX_UPLOAD = 20 * 1024 * 1024
+
+class OcrService:
+    """
+    Fila limitada de jobs na frente de uma OcrWorkerFarm.
+
+    A capacidade é o número de processos (jobs em execução) mais queueSize
+    (jobs aguardando). As vagas só são devolvidas quando o job termina no
+    processo, mesmo que a requisição já tenha respondido com timeout.
+
+    Uso:
+        with OcrWorkerFarm(workers=4) as farm:
+            service = OcrService(farm, queueSize=8)
+            serve(service, '127.0.0.1', 8080)
+    """
+
+    def __init__(self, farm, queueSize=None, timeout=None, maxUpload=DEFAULT_MAX_UPLOAD):
+        """
+        Args:
+            farm (OcrWorkerFarm): Fazenda de processos que executa os jobs.
+            queueSize (int | None): Jobs aguardando além dos em execução (padrão: 2 por processo).
+            timeout (float | None): Tempo máximo de espera pelo resultado de cada requisição
+                em segundos (padrão: o timeout da fazenda; None = sem limite).
+            maxUpload (int): Tamanho máximo do corpo da requisição em bytes.
+
+        Raises:
+            ValueError: Caso queueSize seja negativo.
+        """
+        queueSize = 2 * farm.workers if queueSize is None else queueSize
+        if queueSize < 0:
+            raise ValueError(f'Tamanho de fila inválido: {queueSize}')
+        self.farm = farm
+        self.capacity = farm.workers + queueSize
+        self.timeout = farm.timeout if timeout is None else timeout
+        self.maxUpload = maxUpload
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.lock = threading.Lock()
+        self.inFlight = 0
+        self.counters = {'accepted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'timeouts': 0}
+        # média móvel do tempo de cada job (segundos), usada no Retry-After
+        self.averageTime = None
+        self.ready = False
+        self.closing = False
+
+    def start(self):
+        """
+        Aquece os processos da fazenda e marca o serviço como pronto.
+        """
+        start = time.perf_counter()
+        workers = self.farm.warmUp()
+        self.ready = True
+        logger.info('serviço pronto - %s processos aquecidos em %.2fs', workers, time.perf_counter() - start)
+
+    def close(self):
+        """
+        Para de aceitar jobs (o /readyz passa a responder 503).
+        """
+        self.closing = True
+        self.ready = False
+
+    def reserve(self):
+        """
+        Reserva uma vaga na fila sem bloquear.
+
+        Returns:
+            bool: True se a vaga foi reservada (libere com release ou submit).
+        """
+        if self.closing or not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.counters['rejected'] += 1
+            return False
+        with self.lock:
+            self.inFlight += 1
+        return True
+
+    def release(self):
+        """
+        Devolve uma vaga reservada que não chegou a virar job.
+        """
+        with self.lock:
+            self.inFlight -= 1
+        self.slots.release()
+
+    def submit(self, image, annotatedFormat=None):
+        """
+        Envia um job para a fazenda usando uma vaga já reservada.
+
+        Args:
+            image (bytes): Conteúdo do arquivo de imagem.
+            annotatedFormat (str | None): Formato da imagem anotada ('jpg', 'png' ou 'webp').
+
+        Returns:
+            concurrent.futures.Future: Future com o resultado de _runJob.
+        """
+        try:
+            future = self.farm.submit(image, annotatedFormat)
+        except Exception:
+            self.release()
+            raise
+        with self.lock:
+            self.counters['accepted'] += 1
+        future.add_done_callback(self._finished)
+        return future
+
+    def retryAfter(self):
+        """
+        Returns:
+            int: Segundos sugeridos até uma nova tentativa (tempo para a fila andar uma vez).
+        """
+        average = self.averageTime or 1.0
+        with self.lock:
+            waves = self.inFlight / self.farm.workers
+        return max(1, min(60, math.ceil(average * waves)))
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'workers', 'capacity', 'inFlight', 'running', 'queued', 'averageTime',
+            'ready' e os contadores 'accepted', 'rejected', 'completed', 'failed' e 'timeouts'.
+        """
+        with self.lock:
+            inFlight = self.inFlight
+            counters = dict(self.counters)
+        running = min(inFlight, self.farm.workers)
+        return {
+            'workers': self.farm.workers,
+            'capacity': self.capacity,
+            'inFlight': inFlight,
+            'running': running,
+            'queued': inFlight - running,
+            'averageTime': self.averageTime,
+            'ready': self.ready,
+            **counters
+        }
+
+    def _finished(self, future):
+        failed = future.cancelled() or future.exception() is not None or future.result()['error'] is not None
+        # tempo de serviço medido no processo (sem a espera na fila)
+        elapsed = None if failed else sum(future.result()['timings'].values())
+        with self.lock:
+            self.inFlight -= 1
+            self.counters['failed' if failed else 'completed'] += 1
+            if elapsed is not None:
+                self.averageTime = elapsed if self.averageTime is None else 0.8 * self.averageTime + 0.2 * elapsed
+        self.slots.release()
+
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    """
+    Rotas do serviço. A instância de OcrService fica em self.server.service.
+    """
+
+    server_version = 'OcrServer/1.0'
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlsplit(self.path).path
+        if path == '/healthz':
+            self._json(HTTPStatus.OK, {'status': 'ok'})
+        elif path == '/readyz':
+            stats = service.stats()
+            if not service.ready:
+                self._json(HTTPStatus.SERVICE_UNAVAILABLE, {'status': 'starting' if not service.closing else 'closing'})
+            elif stats['inFlight'] >= stats['capacity']:
+                self._json(HTTPStatus.SERVICE_UNAVAILABLE, {'status': 'full'}, {'Retry-After': service.retryAfter()})
+            else:
+                self._json(HTTPStatus.OK, {'status': 'ready'})
+        elif path == '/queue':
+            self._json(HTTPStatus.OK, service.stats())
+        else:
+            self._error(HTTPStatus.NOT_FOUND, 'Rota não encontrada')
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        if url.path != '/ocr':
+            self._error(HTTPStatus.NOT_FOUND, 'Rota não encontrada')
+            return
+        query = parse_qs(url.query)
+        annotate = query.get('annotate', ['0'])[0].lower() in ('1', 'true', 'yes')
+        annotatedFormat = query.get('format', ['jpg'])[0].lower()
+        if annotatedFormat not in FORMATS:
+            self._error(HTTPStatus.BAD_REQUEST, f'Formato inválido: {annotatedFormat}. Use um de {FORMATS}')
+            return
+
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self._error(HTTPStatus.LENGTH_REQUIRED, 'Content-Length obrigatório')
+            return
+        if int(length) > service.maxUpload:
+            self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f'Imagem maior que {service.maxUpload} bytes')
+            return
+        if not service.reserve():
+            # o corpo não é lido: a conexão é fechada e a imagem não ocupa memória
+            self._error(HTTPStatus.SERVICE_UNAVAILABLE, 'Fila cheia', {'Retry-After': service.retryAfter()})
+            return
+
+        try:
+            image = _readImage(self.rfile.read(int(length)), self.headers.get('Content-Type', ''))
+        except Exception:
+            service.release()
+            raise
+        if not image:
+            service.release()
+            self._error(HTTPStatus.BAD_REQUEST, "Imagem ausente (envie o arquivo no corpo ou no campo 'image')")
+            return
+
+        future = service.submit(image, annotatedFormat if annotate else None)
+        try:
+            result = future.result(timeout=service.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with service.lock:
+                service.counters['timeouts'] += 1
+            self._error(HTTPStatus.GATEWAY_TIMEOUT, f'OCR excedeu {service.timeout}s')
+            return
+        except Exception as e:
+            logger.warning('falha no OCR - %s: %s', type(e).__name__, e)
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f'{type(e).__name__}: {e}')
+            return
+        # falhas dentro do processo voltam como texto em 'error' (ver workerFarm._runJob)
+        if result['error'] == 'timeout':
+            with service.lock:
+                service.counters['timeouts'] += 1
+            self._error(HTTPStatus.GATEWAY_TIMEOUT, f'OCR excedeu {service.timeout}s')
+            return
+        if result['error'] is not None and result['error'].startswith('ValueError:'):
+            self._error(HTTPStatus.BAD_REQUEST, f"Imagem inválida: {result['error'].removeprefix('ValueError: ')}")
+            return
+        if result['error'] is not None:
+            logger.warning('falha no OCR - %s', result['error'])
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, result['error'])
+            return
+
+        body = {
+            'text': result['text'],
+            'words': wordBoxes(result['data']) if result['data'] else [],
+            'osd': result['osd'],
+            'timings': result['timings'],
+            'cache': result['cache']['status'] if result['cache'] else None,
+            'tier': result['cascade']['tier'] if result['cascade'] else None,
+            'winner': result['race']['winner'] if result['race'] else None,
+            'confidence': (result['cascade'] or result['race'] or {}).get('confidence')
+        }
+        if annotate:
+            body['annotated'] = base64.b64encode(result['annotated']).decode('ascii')
+            body['annotatedFormat'] = annotatedFormat
+        self._json(HTTPStatus.OK, body)
+
+    def log_message(self, format, *args):
+        # formatação tardia: a linha de acesso só é montada se o nível INFO estiver habilitado
+        logger.info('%s - ' + format, self.address_string(), *args)
+
+    def _json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message, headers=None):
+        if status in (HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.REQUEST_ENTITY_TOO_LARGE):
+            self.close_connection = True
+            headers = {**(headers or {}), 'Connection': 'close'}
+        self._json(status, {'error': message}, headers)
+
+def _readImage(body, contentType):
+    """
+    Extrai o arquivo de imagem do corpo da requisição.
+
+    Args:
+        body (bytes): Corpo da requisição.
+        contentType (str): Cabeçalho Content-Type.
+
+    Returns:
+        bytes: Conteúdo do arquivo (vazio se não houver imagem).
+    """
+    if not contentType.lower().startswith('multipart/form-data'):
+        return body
+    message = BytesParser(policy=HTTP).parsebytes(f'Content-Type: {contentType}\r\n\r\n'.encode('latin-1') + body)
+    files = [part for part in message.iter_parts() if part.get_filename() is not None or part.get_param('name', header='content-disposition') == 'image']
+    named = [part for part in files if part.get_param('name', header='content-disposition') == 'image']
+    parts = named or files
+    if not parts:
+        return b''
+    return parts[0].get_payload(decode=True) or b''
+
+def createServer(service, host='127.0.0.1', port=8080):
+    """
+    Cria o servidor HTTP (uma thread por conexão) ligado ao serviço.
+
+    Args:
+        service (OcrService): Serviço com a fila de jobs.
+        host (str): Endereço de escuta.
+        port (int): Porta de escuta (0 = porta livre qualquer).
+
+    Returns:
+        http.server.ThreadingHTTPServer: Servidor ainda parado (use serve_forever).
+    """
+    server = ThreadingHTTPServer((host, port), OcrRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def serve(service, host='127.0.0.1', port=8080):
+    """
+    Aquece os processos e atende requisições até Ctrl+C.
+
+    Args:
+        service (OcrService): Serviço com a fila de jobs.
+        host (str): Endereço de escuta.
+        port (int): Porta de escuta.
+    """
+    server = createServer(service, host, port)
+    # o servidor já aceita conexões durante o aquecimento: /healthz responde e /readyz dá 503
+    thread = threading.Thread(target=server.serve_forever, name='OcrServer', daemon=True)
+    thread.start()
+    logger.info('ouvindo em http://%s:%s', *server.server_address[:2])
+    try:
+        service.start()
+        thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,270 @@
+from ocrData import OcrData
+
+"""
+Modelo hierárquico da página (página → bloco → parágrafo → linha → palavra).
+
+O resultado do image_to_data é uma lista plana em que cada linha tem um
+nível (1 a 5) e os números de página/bloco/parágrafo/linha/palavra. Aqui o
+resultado é percorrido uma única vez montando a árvore: cada nó guarda a
+caixa, a confiança média das palavras abaixo dele, o pai, os filhos e a
+posição entre os irmãos, então navegar para cima, para baixo ou para o
+lado é O(1).
+
+Contém funções para:
+- Montar a árvore a partir de image_to_data
+- Navegar entre níveis e entre irmãos
+- Buscar "a linha que contém X" e "o parágrafo abaixo do título Y"
+"""
+
+LEVELS = ('page', 'block', 'paragraph', 'line', 'word')
+KEY_COLUMNS = ('page_num', 'block_num', 'par_num', 'line_num', 'word_num')
+# Separador usado ao juntar o texto dos filhos de cada nível
+TEXT_SEPARATORS = {'page': '\n\n', 'block': '\n\n', 'paragraph': '\n', 'line': ' '}
+
+class LayoutNode:
+    """
+    Nó da árvore da página.
+
+    Attributes:
+        level (str): Nível ('page', 'block', 'paragraph', 'line' ou 'word').
+        key (tuple[int, ...]): Números (página, bloco, parágrafo, linha, palavra) até o nível.
+        left, top, width, height (int): Caixa do nó.
+        parent (LayoutNode | None): Nó pai.
+        children (list[LayoutNode]): Filhos em ordem de leitura.
+        position (int): Posição entre os irmãos.
+        index (int | None): Índice da linha correspondente no resultado do image_to_data.
+        word (str | None): Texto, só nas palavras.
+    """
+
+    __slots__ = ('level', 'key', 'left', 'top', 'width', 'height', 'parent', 'children',
+                 'position', 'index', 'word', 'confSum', 'confCount', '_text')
+
+    def __init__(self, level, key, box=None, parent=None, index=None, word=None):
+        self.level = level
+        self.key = key
+        self.left, self.top, self.width, self.height = box if box else (0, 0, 0, 0)
+        self.parent = parent
+        self.children = []
+        self.position = 0
+        self.index = index
+        self.word = word
+        self.confSum = 0.0
+        self.confCount = 0
+        self._text = None
+        if parent is not None:
+            self.position = len(parent.children)
+            parent.children.append(self)
+
+    @property
+    def box(self):
+        """
+        Returns:
+            tuple[int, int, int, int]: (left, top, width, height).
+        """
+        return self.left, self.top, self.width, self.height
+
+    @property
+    def conf(self):
+        """
+        Returns:
+            float: Confiança média das palavras do nó (-1 se não houver palavras com confiança).
+        """
+        return self.confSum / self.confCount if self.confCount else -1.0
+
+    @property
+    def text(self):
+        """
+        Returns:
+            str: Texto do nó (palavras da linha separadas por espaço, linhas por '\\n', etc.).
+        """
+        if self.level == 'word':
+            return self.word
+        if self._text is None:
+            texts = (child.text for child in self.children)
+            self._text = TEXT_SEPARATORS[self.level].join(text for text in texts if text)
+        return self._text
+
+    def next(self):
+        """
+        Returns:
+            LayoutNode | None: Próximo irmão.
+        """
+        if self.parent is None or self.position + 1 >= len(self.parent.children):
+            return None
+        return self.parent.children[self.position + 1]
+
+    def previous(self):
+        """
+        Returns:
+            LayoutNode | None: Irmão anterior.
+        """
+        if self.parent is None or self.position == 0:
+            return None
+        return self.parent.children[self.position - 1]
+
+    def ancestor(self, level):
+        """
+        Args:
+            level (str): Nível desejado.
+
+        Returns:
+            LayoutNode | None: O próprio nó ou o ancestral naquele nível.
+        """
+        node = self
+        while node is not None and node.level != level:
+            node = node.parent
+        return node
+
+    def iter(self, level):
+        """
+        Percorre os descendentes de um nível, em ordem de leitura.
+
+        Args:
+            level (str): Nível desejado.
+
+        Yields:
+            LayoutNode: Nós daquele nível abaixo deste (ou o próprio nó).
+        """
+        if self.level == level:
+            yield self
+            return
+        for child in self.children:
+            yield from child.iter(level)
+
+    def _expand(self, left, top, width, height):
+        if not self.width and not self.height:
+            self.left, self.top, self.width, self.height = left, top, width, height
+            return
+        right = max(self.left + self.width, left + width)
+        bottom = max(self.top + self.height, top + height)
+        self.left, self.top = min(self.left, left), min(self.top, top)
+        self.width, self.height = right - self.left, bottom - self.top
+
+    def __repr__(self):
+        return f'LayoutNode({self.level}, {self.key}, box={self.box}, conf={self.conf:.1f})'
+
+class PageLayout:
+    """
+    Árvore da página montada em uma passada pelo resultado do image_to_data.
+
+    Uso:
+        layout = PageLayout(result)
+        line = layout.lineContaining('Total')
+        paragraph = layout.paragraphUnder('Ingredientes')
+        for line in layout.levels['line']:
+            print(line.box, line.conf, line.text)
+    """
+
+    def __init__(self, result):
+        """
+        Args:
+            result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+                Linhas de nível ausentes (ex: resultado filtrado só com palavras)
+                são criadas a partir dos números, com a caixa das palavras.
+        """
+        table = OcrData.fromDict(result)
+        self.data = table
+        self.pages = []
+        self.levels = {level: [] for level in LEVELS}
+        self.byIndex = {}
+        self._nodes = {}
+
+        columns = [table[name].tolist() for name in ('level',) + KEY_COLUMNS + ('left', 'top', 'width', 'height', 'conf')]
+        texts = table['text'].tolist()
+        for index, row in enumerate(zip(*columns)):
+            depth = row[0]
+            if not 1 <= depth <= len(LEVELS):
+                continue
+            key = row[1:1 + depth]
+            box = row[6:10]
+            if depth == len(LEVELS) and not texts[index].strip():
+                continue
+            node = self._node(depth, key, box, index, texts[index] if depth == len(LEVELS) else None)
+            self.byIndex[index] = node
+            if depth == len(LEVELS) and row[10] >= 0:
+                ancestor = node
+                while ancestor is not None:
+                    ancestor.confSum += row[10]
+                    ancestor.confCount += 1
+                    ancestor = ancestor.parent
+        del self._nodes
+
+    def _node(self, depth, key, box, index=None, word=None):
+        node = self._nodes.get(key)
+        if node is not None:
+            if box is not None:
+                node.left, node.top, node.width, node.height = box
+                node.index = index
+            return node
+
+        parent = self._node(depth - 1, key[:-1], None) if depth > 1 else None
+        node = LayoutNode(LEVELS[depth - 1], key, box, parent, index, word)
+        self._nodes[key] = node
+        self.levels[node.level].append(node)
+        if parent is None:
+            self.pages.append(node)
+        if box is not None:
+            # nós criados sem linha própria no resultado herdam a caixa das palavras
+            ancestor = parent
+            while ancestor is not None and ancestor.index is None:
+                ancestor._expand(*box)
+                ancestor = ancestor.parent
+        return node
+
+    def node(self, index):
+        """
+        Args:
+            index (int): Índice da linha no resultado do image_to_data.
+
+        Returns:
+            LayoutNode | None: Nó correspondente.
+        """
+        return self.byIndex.get(index)
+
+    def lineContaining(self, text, start=None):
+        """
+        Procura a primeira linha cujo texto contém `text`.
+
+        Args:
+            text (str): Trecho procurado (diferencia maiúsculas e minúsculas).
+            start (LayoutNode | None): Linha a partir da qual procurar (exclusiva).
+
+        Returns:
+            LayoutNode | None: Linha encontrada.
+        """
+        lines = self.levels['line']
+        first = 0
+        if start is not None:
+            first = lines.index(start) + 1
+        for line in lines[first:]:
+            if text in line.text:
+                return line
+        return None
+
+    def paragraphUnder(self, heading):
+        """
+        Retorna o parágrafo logo abaixo de um título.
+
+        Se o título é a última linha do seu parágrafo, devolve o próximo parágrafo
+        (do mesmo bloco ou do bloco seguinte); senão, o resto do parágrafo fica
+        abaixo do título e o próprio parágrafo é devolvido.
+
+        Args:
+            heading (str): Trecho do título.
+
+        Returns:
+            LayoutNode | None: Parágrafo encontrado.
+        """
+        line = self.lineContaining(heading)
+        if line is None:
+            return None
+        paragraph = line.parent
+        if line.next() is not None:
+            return paragraph
+        following = paragraph.next()
+        if following is not None:
+            return following
+        block = paragraph.parent.next()
+        while block is not None and not block.children:
+            block = block.next()
+        return block.children[0] if block is not None else None
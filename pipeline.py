@@ -0,0 +1,299 @@
+import inspect
+import json
+import os
+import threading
+import cv2 # OpenCV
+import preprocessing
+from tiling import tiledStep, halo
+
+"""
+Pipeline declarativo de pré-processamento.
+
+Em vez de comentar e descomentar linhas em preProcessing, as etapas são
+descritas por uma especificação ordenada (lista Python ou arquivo JSON/YAML)
+que nomeia funções de preprocessing.py e seus parâmetros. A especificação é
+validada uma única vez na construção; depois cada imagem só percorre a lista
+de funções já resolvidas.
+
+Formato de cada etapa:
+- "grayscale"                                    (só o nome)
+- {"step": "binarizationSimple", "threshold": 140, "thresholdMax": 255}
+- {"step": "resizing", "fx": 1.5, "fy": 1.5, "interpolation": "cv2.INTER_CUBIC"}
+- {"step": "autoResize", "targetHeight": 22}
+
+Strings no formato "cv2.NOME" viram a constante correspondente do OpenCV.
+O arquivo pode conter a lista diretamente ou um objeto {"steps": [...]}.
+
+Contém funções para:
+- Carregar uma especificação de um arquivo JSON/YAML ou de um texto JSON
+- Validar e compilar a especificação
+- Executar o pipeline sobre uma imagem, opcionalmente reaproveitando buffers
+"""
+
+# Funções de preprocessing.py que não são etapas (não recebem a imagem como primeiro argumento
+# ou não devolvem uma imagem)
+_NOT_STEPS = {'removeNoiseErosionTechnique', 'removeNoiseDilationTechnique', 'estimateTextHeight', 'estimateOrientation'}
+
+def availableSteps():
+    """
+    Lista as funções de preprocessing.py que podem ser usadas como etapa.
+
+    Returns:
+        list[str]: Nomes das etapas em ordem alfabética.
+    """
+    return sorted(
+        name for name, value in vars(preprocessing).items()
+        if inspect.isfunction(value)
+        and value.__module__ == preprocessing.__name__
+        and not name.startswith('_')
+        and name not in _NOT_STEPS
+    )
+
+def _resolveValue(value):
+    if isinstance(value, str) and value.startswith('cv2.'):
+        constant = getattr(cv2, value[4:], None)
+        if not isinstance(constant, int):
+            raise ValueError(f'Constante do OpenCV inválida: {value}')
+        return constant
+    if isinstance(value, list):
+        return [_resolveValue(item) for item in value]
+    return value
+
+def _compileStep(index, step, tileSize=None):
+    if isinstance(step, str):
+        name, params = step, {}
+    elif isinstance(step, dict) and isinstance(step.get('step'), str):
+        params = dict(step)
+        name = params.pop('step')
+    else:
+        raise ValueError(f'Etapa {index} inválida: {step!r}. Use "nome" ou {{"step": "nome", ...}}')
+
+    if name not in availableSteps():
+        raise ValueError(f'Etapa {index}: função desconhecida {name!r}. Disponíveis: {", ".join(availableSteps())}')
+    func = getattr(preprocessing, name)
+    if 'dst' in params:
+        raise ValueError(f'Etapa {index} ({name}): o parâmetro dst é controlado pelo pipeline')
+    params = {key: _resolveValue(value) for key, value in params.items()}
+    try:
+        inspect.signature(func).bind(None, **params)
+    except TypeError as e:
+        raise ValueError(f'Etapa {index} ({name}): parâmetros inválidos - {e}') from None
+    if tileSize and halo(name, params):
+        func = tiledStep(name, tileSize, params)
+    return name, func, params
+
+def readSpec(source):
+    """
+    Lê o conteúdo de uma especificação sem validar o formato.
+
+    Args:
+        source (str | list | dict): Caminho de um arquivo .json/.yaml/.yml, texto JSON
+            ou o próprio conteúdo já carregado.
+
+    Raises:
+        ValueError: Caso o arquivo/texto não possa ser lido.
+
+    Returns:
+        object: Conteúdo carregado (lista ou dict).
+    """
+    if not isinstance(source, str):
+        return source
+    if os.path.isfile(source):
+        with open(source, encoding='utf-8') as file:
+            content = file.read()
+        if source.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError('Para ler pipelines em YAML instale o pacote PyYAML') from None
+            return yaml.safe_load(content)
+        return json.loads(content)
+    try:
+        return json.loads(source)
+    except json.JSONDecodeError:
+        raise ValueError(f'Pipeline não encontrado ou JSON inválido: {source}') from None
+
+def loadSpec(source):
+    """
+    Lê uma especificação de pipeline.
+
+    Args:
+        source (str | list): Caminho de um arquivo .json/.yaml/.yml, texto JSON
+            ou a própria lista de etapas.
+
+    Raises:
+        ValueError: Caso o conteúdo não seja uma especificação válida.
+
+    Returns:
+        list: Etapas da especificação.
+    """
+    spec = readSpec(source)
+    if isinstance(spec, dict):
+        spec = spec.get('steps')
+    if not isinstance(spec, list):
+        raise ValueError('A especificação do pipeline deve ser uma lista de etapas')
+    return spec
+
+class BufferPool:
+    """
+    Buffers de saída reaproveitados entre imagens, no máximo dois por (shape, dtype).
+
+    Com dois buffers por formato, etapas seguidas que mantêm o tamanho alternam
+    entre eles (ping-pong): a saída nunca é escrita sobre a entrada da etapa.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.plan = {}
+        self.inputKey = None
+
+    def reset(self, inputKey):
+        """
+        Descarta os buffers quando o tamanho da imagem de entrada muda.
+
+        Args:
+            inputKey (tuple): (shape, dtype) da imagem de entrada do pipeline.
+        """
+        if inputKey != self.inputKey:
+            self.buffers.clear()
+            self.plan.clear()
+            self.inputKey = inputKey
+
+    def take(self, index, img):
+        """
+        Escolhe o buffer de saída da etapa, se o formato dela já é conhecido.
+
+        Args:
+            index (int): Posição da etapa no pipeline.
+            img (numpy.ndarray): Entrada da etapa (nunca é devolvida como saída).
+
+        Returns:
+            numpy.ndarray | None: Buffer livre ou None (a etapa aloca).
+        """
+        key = self.plan.get(index)
+        for buffer in self.buffers.get(key, ()):
+            if buffer is not img:
+                return buffer
+        return None
+
+    def adopt(self, index, out):
+        """
+        Guarda a saída alocada por uma etapa para reaproveitar nas próximas imagens.
+
+        Args:
+            index (int): Posição da etapa no pipeline.
+            out (numpy.ndarray): Saída da etapa.
+        """
+        key = (out.shape, out.dtype.str)
+        self.plan[index] = key
+        buffers = self.buffers.setdefault(key, [])
+        if not any(buffer is out for buffer in buffers):
+            buffers.append(out)
+            del buffers[:-2]
+
+class PreprocessingPipeline:
+    """
+    Sequência de etapas de preprocessing.py validada uma única vez.
+
+    A instância é chamável (img -> img) e serializável com pickle, então pode
+    ser usada direto como 'preprocess' da OcrWorkerFarm. O método describe()
+    gera a descrição estável usada na chave do cache de OCR.
+
+    Com reuseBuffers=True cada thread mantém um BufferPool e passa `dst=` às
+    etapas, então depois da primeira imagem de um tamanho o processamento não
+    aloca novos frames. Nesse modo a imagem devolvida pertence ao pipeline e
+    só vale até a próxima chamada na mesma thread (copie se precisar guardar).
+
+    Uso:
+        pipeline = PreprocessingPipeline.load('pipelines/livro.json')
+        img = pipeline(img)
+    """
+
+    def __init__(self, spec, reuseBuffers=False, tileSize=None):
+        """
+        Args:
+            spec (list | str): Etapas no formato descrito no módulo, ou caminho/texto aceito por loadSpec.
+            reuseBuffers (bool): Se deve reaproveitar os buffers de saída entre imagens.
+            tileSize (int | None): Se informado, as etapas de vizinhança (blur, bilateral,
+                morfologia, binarização adaptativa) rodam em blocos desse lado em um pool
+                de threads (ver tiling.py). O resultado é idêntico ao da execução normal.
+
+        Raises:
+            ValueError: Caso alguma etapa seja inválida.
+        """
+        self.spec = loadSpec(spec)
+        self.steps = [_compileStep(index, step, tileSize) for index, step in enumerate(self.spec)]
+        self.reuseBuffers = reuseBuffers
+        self.tileSize = tileSize
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls, source, reuseBuffers=False, tileSize=None):
+        """
+        Cria o pipeline a partir de um arquivo JSON/YAML ou de um texto JSON.
+
+        Args:
+            source (str): Caminho do arquivo ou texto JSON.
+            reuseBuffers (bool): Se deve reaproveitar os buffers de saída entre imagens.
+            tileSize (int | None): Lado dos blocos das etapas de vizinhança (None = sem blocos).
+
+        Returns:
+            PreprocessingPipeline: Pipeline validado.
+        """
+        return cls(source, reuseBuffers, tileSize)
+
+    def __getstate__(self):
+        # os buffers são por processo/thread e não vão junto no pickle
+        state = dict(self.__dict__)
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def __call__(self, img):
+        """
+        Aplica as etapas em ordem.
+
+        Args:
+            img (numpy.ndarray): Imagem de entrada (BGR).
+
+        Returns:
+            numpy.ndarray: Imagem pré-processada.
+        """
+        if not self.reuseBuffers:
+            for name, func, params in self.steps:
+                img = func(img, **params)
+            return img
+
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = BufferPool()
+        pool.reset((img.shape, img.dtype.str))
+        for index, (name, func, params) in enumerate(self.steps):
+            dst = pool.take(index, img)
+            out = func(img, dst=dst, **params)
+            # etapas que podem não fazer nada (ex: autoResize) devolvem a própria entrada,
+            # que não pertence ao pool
+            if out is not dst and out is not img:
+                pool.adopt(index, out)
+            img = out
+        return img
+
+    def __len__(self):
+        return len(self.steps)
+
+    def describe(self):
+        """
+        Returns:
+            str: Descrição estável das etapas e parâmetros (usada na chave do cache).
+        """
+        parts = []
+        for name, func, params in self.steps:
+            args = ', '.join(f'{key}={value!r}' for key, value in sorted(params.items()))
+            parts.append(f'{name}({args})')
+        return 'pipeline[' + ' > '.join(parts) + ']'
+
+    def __repr__(self):
+        return f'PreprocessingPipeline({self.describe()})'
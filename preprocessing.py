@@ -1,38 +1,49 @@
+import functools
 import cv2 # OpenCV
+import numpy as np
+from logUtils import getLogger, ArraySummary
 
 """
 Módulo de pré-processamento de imagens para OCR.
 
 Contém funções para conversão de cores, binarização, inversão e redimensionamento
-de imagens, com foco em preparar imagens para ferramentas como Tesseract.
+de imagens (por fator fixo ou pela altura estimada do texto), com foco em preparar imagens para ferramentas como Tesseract.
+
+Todas as etapas aceitam um `dst` opcional: quando o buffer tem o tamanho e o
+tipo da saída o OpenCV escreve nele em vez de alocar um novo array (ver o
+modo reuseBuffers de pipeline.PreprocessingPipeline).
 """
 
-def convertBGRtoRGB(image):
+logger = getLogger('preprocessing')
+
+def convertBGRtoRGB(image, dst=None):
     """
     Converte uma imagem do espaço de cor BGR (padrão do OpenCV)
     para RGB (padrão do Pillow / Tesseract / exibição correta).
 
     Args:
         image (numpy.ndarray): Imagem em formato BGR.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem convertida para RGB.
     """
-    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=dst)
 
-def grayscale(img):
+def grayscale(img, dst=None):
     """
     Converte uma imagem BGR para escala de cinza.
 
     Args:
         img (numpy.ndarray): Imagem em BGR.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem em escala de cinza.
     """
-    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=dst)
 
-def binarizationSimple(gray, threshold, thresholdMax):
+def binarizationSimple(gray, threshold, thresholdMax, dst=None):
     """
     Binariza a imagem em tons de cinza usando limiarização simples.
 
@@ -40,53 +51,57 @@ def binarizationSimple(gray, threshold, thresholdMax):
         gray (numpy.ndarray): Imagem em escala de cinza.
         threshold (int): Limiar mínimo.
         thresholdMax (int): Valor máximo (geralmente 255).
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem binarizada.
     """
-    val, thresh = cv2.threshold(gray, threshold, thresholdMax, cv2.THRESH_BINARY)
-    print(f'preprocessing - binarizationSimple - {val}', end='\n\n')
+    val, thresh = cv2.threshold(gray, threshold, thresholdMax, cv2.THRESH_BINARY, dst=dst)
+    logger.debug('binarizationSimple - limiar=%s', val)
     return thresh
 
-def binarizationOtsu(gray):
+def binarizationOtsu(gray, dst=None):
     """
     Binariza a imagem usando o método de Otsu, que calcula o melhor limiar automaticamente.
 
     Args:
         gray (numpy.ndarray): Imagem em escala de cinza.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem binarizada.
     """
-    val, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-    print(f'preprocessing - binarizationOtsu - {val}', end='\n\n')
+    val, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)
+    logger.debug('binarizationOtsu - limiar=%s', val)
     return otsu
 
-def binarizationAdaptive(gray):
+def binarizationAdaptive(gray, dst=None):
     """
     Binarização adaptativa por média local.
 
     Args:
         gray (numpy.ndarray): Imagem em escala de cinza.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem binarizada.
     """
-    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 9)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 9, dst=dst)
 
-def binarizationAdaptiveGaussiana(gray):
+def binarizationAdaptiveGaussiana(gray, dst=None):
     """
     Binarização adaptativa usando método Gaussiano.
 
     Args:
         gray (numpy.ndarray): Imagem em escala de cinza.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem binarizada.
     """
-    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 9)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 9, dst=dst)
 
-def colorInversion(gray):
+def colorInversion(gray, dst=None):
     """
     Inverte as cores da imagem em tons de cinza (texto preto → fundo branco).
 
@@ -95,14 +110,15 @@ def colorInversion(gray):
 
     Args:
         gray (numpy.ndarray): Imagem em escala de cinza.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem com cores invertidas.
     """
-    invert = 255 - gray
-    return invert
+    # igual a 255 - gray para uint8, mas sem alocar quando há dst
+    return cv2.bitwise_not(gray, dst=dst)
 
-def resizing(gray, fx, fy, interpolation):
+def resizing(gray, fx, fy, interpolation, dst=None):
     """
     Redimensiona a imagem com base em fatores de escala.
 
@@ -111,13 +127,315 @@ def resizing(gray, fx, fy, interpolation):
         fx (float): Fator de escala horizontal ( >1 aumenta, <1 diminui ).
         fy (float): Fator de escala vertical ( >1 aumenta, <1 diminui ).
         interpolation (int): Método de interpolação (ex: cv2.INTER_LINEAR).
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
     Returns:
         numpy.ndarray: Imagem redimensionada.
     """
-    return cv2.resize(gray, None, fx=fx, fy=fy, interpolation=interpolation)
+    return cv2.resize(gray, None, dst=dst, fx=fx, fy=fy, interpolation=interpolation)
+
+def _textMask(img, scale):
+    """
+    Cópia reduzida e binarizada (Otsu) com o texto em branco (lado minoritário do limiar).
+    """
+    small = img if scale == 1.0 else cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        cv2.bitwise_not(binary, dst=binary)
+    return binary
+
+def estimateTextHeight(img, maxSide=1024, minComponents=5, minHeight=5):
+    """
+    Estima a altura dominante dos caracteres pelas componentes conexas.
+
+    A estimativa roda em uma cópia reduzida (lado maior até maxSide) binarizada
+    com Otsu; o texto é o lado minoritário do limiar. Componentes que não têm
+    forma de caractere (linhas, molduras, barras de código de barras) e as
+    menores que minHeight (ruído, pingos de i e acentos) são descartadas e fica
+    a mediana das alturas, convertida de volta para a escala original. Se a
+    cópia reduzida tiver poucos caracteres ou caracteres muito pequenos para
+    medir, a estimativa é refeita na imagem inteira.
+
+    Args:
+        img (numpy.ndarray): Imagem BGR ou em escala de cinza.
+        maxSide (int): Lado maior da cópia reduzida usada na estimativa.
+        minComponents (int): Mínimo de componentes com forma de caractere.
+        minHeight (int): Altura mínima de um caractere, em pixels da imagem analisada.
+
+    Returns:
+        float | None: Altura dos caracteres em pixels da imagem original, ou None
+        se não houver texto suficiente para estimar.
+    """
+    height, width = img.shape[:2]
+    scale = min(1.0, maxSide / max(height, width))
+    while True:
+        binary = _textMask(img, scale)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        w = stats[1:, cv2.CC_STAT_WIDTH]
+        h = stats[1:, cv2.CC_STAT_HEIGHT]
+        area = stats[1:, cv2.CC_STAT_AREA]
+        glyphs = (
+            (h >= minHeight) & (h <= binary.shape[0] // 2)
+            & (w <= 3 * h) & (h <= 8 * w)
+            & (area >= 0.1 * w * h)
+        )
+        heights = h[glyphs]
+
+        measurable = len(heights) >= minComponents and np.median(heights) >= 8
+        if measurable or scale == 1.0:
+            break
+        scale = 1.0
+
+    if len(heights) < minComponents:
+        return None
+    return float(np.median(heights)) / scale
+
+def autoResize(img, targetHeight=22, minHeight=16, maxHeight=36, maxScale=3.0, maxPixels=9_000_000, dst=None):
+    """
+    Redimensiona a imagem para que o texto fique no tamanho preferido do Tesseract.
+
+    Substitui o fator fixo do resizing: a altura dos caracteres é estimada por
+    estimateTextHeight (em texto corrido fica perto da altura das minúsculas) e
+    a imagem é escalada para targetHeight (INTER_CUBIC para
+    ampliar, INTER_AREA para reduzir). Se a altura já está entre minHeight e
+    maxHeight, ou não há texto para medir, a imagem é devolvida sem cópia.
+    A ampliação para em maxPixels, então digitalizações grandes não crescem.
+
+    Args:
+        img (numpy.ndarray): Imagem BGR ou em escala de cinza.
+        targetHeight (float): Altura desejada dos caracteres em pixels.
+        minHeight (float): Menor altura aceita sem redimensionar.
+        maxHeight (float): Maior altura aceita sem redimensionar.
+        maxScale (float): Limite do fator de escala (para ampliar e, invertido, para reduzir).
+        maxPixels (int): Máximo de pixels da imagem ampliada (padrão: uma página A4 em 300 dpi).
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
+
+    Returns:
+        numpy.ndarray: Imagem redimensionada (ou a própria entrada).
+    """
+    textHeight = estimateTextHeight(img)
+    if textHeight is None or minHeight <= textHeight <= maxHeight:
+        return img
+    scale = max(1 / maxScale, min(maxScale, targetHeight / textHeight))
+    if scale > 1:
+        scale = min(scale, np.sqrt(maxPixels / (img.shape[0] * img.shape[1])))
+        if scale <= 1:
+            return img
+    interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+    return cv2.resize(img, None, dst=dst, fx=scale, fy=scale, interpolation=interpolation)
+
+def _profileSharpness(points, angles, vertical):
+    # nitidez do perfil de projeção ao longo das linhas inclinadas de cada ângulo:
+    # linhas de texto alinhadas com a direção dão picos altos e vales vazios
+    x, y = points
+    scores = []
+    for angle in np.radians(angles):
+        if vertical:
+            position = x * np.cos(angle) + y * np.sin(angle)
+        else:
+            position = y * np.cos(angle) - x * np.sin(angle)
+        profile = np.bincount((position - position.min()).astype(np.intp))
+        scores.append(float(np.square(np.diff(profile.astype(np.float64))).sum()))
+    return np.array(scores)
+
+def _glyphComponents(binary, minSize=5):
+    # componentes com forma de caractere: descarta ruído, pingos de i, acentos e
+    # pontuação (menores que metade do tamanho típico), códigos de barras, linhas
+    # de tabela, molduras e manchas do fundo, que dominariam os perfis e as contagens
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+    size = np.maximum(w, h)
+    glyphs = (
+        (size >= minSize) & (h <= binary.shape[0] // 2) & (w <= binary.shape[1] // 2)
+        & (h <= 8 * w) & (w <= 8 * h)
+    )
+    glyphs[0] = False
+    if glyphs.any():
+        glyphs &= size >= 0.5 * np.median(size[glyphs])
+    return labels, stats, centroids, glyphs
+
+def _readingAxis(centroids, maxComponents=2000, chunk=256):
+    # o vizinho mais próximo de cada caractere costuma ser a letra ao lado na mesma
+    # linha (o espaço entre letras é menor que o entrelinhas), então a direção até
+    # ele vota no eixo das linhas; funciona também com uma única linha de texto
+    if len(centroids) > maxComponents:
+        centroids = centroids[np.random.default_rng(0).choice(len(centroids), maxComponents, replace=False)]
+    horizontal = 0
+    for start in range(0, len(centroids), chunk):
+        block = centroids[start:start + chunk]
+        offsets = block[:, None, :] - centroids[None, :, :]
+        distances = np.square(offsets).sum(axis=2)
+        rows = np.arange(len(block))
+        distances[rows, rows + start] = np.inf
+        nearest = offsets[rows, distances.argmin(axis=1)]
+        horizontal += int((np.abs(nearest[:, 0]) > np.abs(nearest[:, 1])).sum())
+    return horizontal, len(centroids) - horizontal
+
+def _ascendersAndDescenders(binary, maxComponents=2000):
+    # Compara cada caractere com os vizinhos da mesma linha: o topo bem acima dos
+    # topos vizinhos é um ascendente (b, d, f, h, k, l, t e maiúsculas) e a base bem
+    # abaixo das bases vizinhas é um descendente (g, j, p, q, y). Ascendentes são mais
+    # comuns, então texto de cabeça para baixo tem mais "descendentes". A vizinhança
+    # é local, o que tolera páginas curvas; componentes pequenas já foram descartadas.
+    _, stats, centroids, glyphs = _glyphComponents(binary)
+    index = np.flatnonzero(glyphs)
+    if len(index) > maxComponents:
+        index = np.sort(np.random.default_rng(0).choice(index, maxComponents, replace=False))
+    top = stats[index, cv2.CC_STAT_TOP].astype(np.float64)
+    bottom = top + stats[index, cv2.CC_STAT_HEIGHT]
+    x = centroids[index, 0]
+    y = (top + bottom) / 2
+    size = float(np.median(bottom - top)) if len(index) else 0.0
+    ascenders = descenders = 0
+    for i in range(len(index)):
+        near = (np.abs(y - y[i]) < 0.6 * size) & (np.abs(x - x[i]) < 5 * size)
+        near[i] = False
+        if near.sum() < 2:
+            continue
+        ascenders += top[i] < np.median(top[near]) - 0.15 * size
+        descenders += bottom[i] > np.median(bottom[near]) + 0.15 * size
+    return int(ascenders), int(descenders)
+
+def _margin(first, second, scale=4.0):
+    # diferença entre duas contagens em desvios-padrão (binomial), levada para 0 a 1:
+    # poucas amostras ou contagens parecidas dão confiança baixa
+    total = first + second
+    if not total:
+        return 0.0
+    return min(abs(first - second) / np.sqrt(total) / scale, 1.0)
+
+def estimateOrientation(img, maxSide=1024, maxSkew=10.0, maxPoints=200000):
+    """
+    Estima a rotação do texto (0/90/180/270 mais a inclinação) sem chamar o Tesseract.
+
+    Roda em uma cópia reduzida e binarizada, só com as componentes que têm
+    forma de caractere. O eixo das linhas (horizontal ou vertical) sai da
+    direção até o vizinho mais próximo de cada caractere; a inclinação sai do
+    ângulo cujo perfil de projeção é mais nítido (busca de 1 em 1 grau e
+    depois de 0,1 em 0,1). O sentido (0 ou 180, 90 ou 270) sai da contagem de
+    ascendentes e descendentes.
+
+    A confiança é a margem entre os candidatos: eixo (votos horizontais contra
+    verticais) vezes sentido (ascendentes contra descendentes), cada um medido
+    em desvios-padrão da contagem. Texto só em maiúsculas ou com poucos
+    caracteres fica com confiança baixa; sem evidência de que o texto está de
+    cabeça para baixo, o sentido fica em 0 (ou 90).
+
+    Args:
+        img (numpy.ndarray): Imagem BGR ou em escala de cinza.
+        maxSide (int): Lado maior da cópia reduzida usada na estimativa.
+        maxSkew (float): Maior inclinação procurada, em graus, para cada lado.
+        maxPoints (int): Máximo de pixels de texto amostrados para os perfis.
+
+    Returns:
+        dict: 'rotate' (0, 90, 180 ou 270: giro no sentido horário que deixa o texto
+        em pé, mesma convenção do OSD do Tesseract), 'skew' (graus no sentido
+        anti-horário a aplicar depois, como em cv2.getRotationMatrix2D),
+        'angle' (rotação anti-horária total) e 'confidence' (0 a 1; 0 se não há texto).
+    """
+    height, width = img.shape[:2]
+    binary = _textMask(img, min(1.0, maxSide / max(height, width)))
+    labels, _, centroids, glyphs = _glyphComponents(binary)
+    binary = np.where(glyphs[labels], np.uint8(255), np.uint8(0))
+    y, x = np.nonzero(binary)
+    if glyphs.sum() < 3 or len(x) < 100:
+        return {'rotate': 0, 'skew': 0.0, 'angle': 0.0, 'confidence': 0.0}
+    if len(x) > maxPoints:
+        pick = np.random.default_rng(0).choice(len(x), maxPoints, replace=False)
+        x, y = x[pick], y[pick]
+    points = (x.astype(np.float64), y.astype(np.float64))
+
+    horizontalVotes, verticalVotes = _readingAxis(centroids[glyphs])
+    isVertical = verticalVotes > horizontalVotes
+    coarse = np.arange(-maxSkew, maxSkew + 0.5, 1.0)
+    best = coarse[_profileSharpness(points, coarse, isVertical).argmax()]
+    fine = np.arange(best - 0.9, best + 0.95, 0.1)
+    skew = round(float(fine[_profileSharpness(points, fine, isVertical).argmax()]), 1)
+
+    # endireita a cópia pequena (sentido ainda desconhecido) para contar ascendentes e descendentes
+    base = 90.0 if isVertical else 0.0
+    upright = rotate(binary, base + skew, interpolation=cv2.INTER_NEAREST)
+    ascenders, descenders = _ascendersAndDescenders(upright)
+    quarter = base + 180.0 if descenders > ascenders else base
+
+    return {
+        'rotate': int(-quarter % 360),
+        'skew': skew,
+        'angle': (quarter + skew + 180.0) % 360.0 - 180.0,
+        'confidence': float(_margin(horizontalVotes, verticalVotes) * _margin(ascenders, descenders))
+    }
+
+def rotate(img, angle, interpolation=cv2.INTER_LINEAR, dst=None):
+    """
+    Gira a imagem em um único warpAffine, ampliando a tela para não cortar os cantos.
+
+    Múltiplos exatos de 90 graus usam cv2.rotate (sem interpolação).
+
+    Args:
+        img (numpy.ndarray): Imagem de entrada.
+        angle (float): Graus no sentido anti-horário.
+        interpolation (int): Método de interpolação do warpAffine.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
+
+    Returns:
+        numpy.ndarray: Imagem girada (ou a própria entrada se angle == 0).
+    """
+    angle = angle % 360.0
+    if angle == 0:
+        return img
+    if angle in (90.0, 180.0, 270.0):
+        codes = {90.0: cv2.ROTATE_90_COUNTERCLOCKWISE, 180.0: cv2.ROTATE_180, 270.0: cv2.ROTATE_90_CLOCKWISE}
+        return cv2.rotate(img, codes[angle], dst=dst)
+
+    height, width = img.shape[:2]
+    center = (width / 2, height / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    size = (int(round(height * sin + width * cos)), int(round(height * cos + width * sin)))
+    matrix[0, 2] += size[0] / 2 - center[0]
+    matrix[1, 2] += size[1] / 2 - center[1]
+    return cv2.warpAffine(img, matrix, size, dst=dst, flags=interpolation, borderMode=cv2.BORDER_REPLICATE)
+
+def deskew(img, minSkew=0.2, maxSkew=10.0, minConfidence=0.3, osdFallback=False, config_tesseract='', dst=None):
+    """
+    Endireita a imagem: corrige a orientação (0/90/180/270) e a inclinação em uma única rotação.
 
-def removeNoiseErosionTechnique(gray, matriz):
+    Usa estimateOrientation, sem processo do Tesseract. Com confiança abaixo de
+    minConfidence a orientação não é alterada (só a inclinação é corrigida), a
+    menos que osdFallback=True: aí o OSD do Tesseract decide a orientação (a
+    inclinação continua sendo a estimada); se o OSD falhar, a orientação fica como está.
+
+    Args:
+        img (numpy.ndarray): Imagem BGR ou em escala de cinza.
+        minSkew (float): Inclinações menores que isso (em graus) são ignoradas.
+        maxSkew (float): Maior inclinação procurada, em graus.
+        minConfidence (float): Confiança mínima da estimativa para girar 90/180/270 graus sem o OSD.
+        osdFallback (bool): Se deve consultar o OSD do Tesseract quando a confiança é baixa.
+        config_tesseract (str): Configurações Tesseract usadas pelo OSD (ex: '--tessdata-dir tessdata').
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
+
+    Returns:
+        numpy.ndarray: Imagem endireitada (ou a própria entrada, se já estiver reta).
+    """
+    estimate = estimateOrientation(img, maxSkew=maxSkew)
+    skew = estimate['skew']
+    rotation = estimate['rotate'] if estimate['confidence'] >= minConfidence else 0
+    if osdFallback and estimate['confidence'] < minConfidence:
+        # import tardio: o módulo não depende do Tesseract quando o OSD não é usado
+        from tesseractUtils import imageToOsd
+        from pytesseract import TesseractError
+        from pytesseract.pytesseract import osd_to_dict
+        try:
+            rotation = int(osd_to_dict(imageToOsd(img, config_tesseract))['rotate'])
+        except (TesseractError, KeyError, ValueError):
+            pass
+    if abs(skew) < minSkew:
+        skew = 0.0
+    return rotate(img, skew - rotation, dst=dst)
+
+def removeNoiseErosionTechnique(gray, matriz, dst=None):
     """
     Remove ruídos de uma imagem aplicando a técnica de **erosão**.
 
@@ -127,15 +445,16 @@ def removeNoiseErosionTechnique(gray, matriz):
     Args:
         gray (numpy.ndarray): Imagem em tons de cinza ou binarizada.
         matriz (numpy.ndarray): Elemento estruturante (kernel) para a erosão.
+        dst (numpy.ndarray | None): Buffer de saída (pode ser o próprio gray).
 
     Returns:
         numpy.ndarray: Imagem após a erosão.
     """
-    erosion = cv2.erode(gray, matriz)
-    print(f'preprocessing - removeNoiseErosionTechnique - {erosion}', end='\n\n')
+    erosion = cv2.erode(gray, matriz, dst=dst)
+    logger.debug('removeNoiseErosionTechnique - %s', ArraySummary(erosion))
     return erosion
 
-def removeNoiseDilationTechnique(gray, matriz):
+def removeNoiseDilationTechnique(gray, matriz, dst=None):
     """
     Remove ruídos ou reforça contornos aplicando a técnica de **dilatação**.
 
@@ -145,22 +464,115 @@ def removeNoiseDilationTechnique(gray, matriz):
     Args:
         gray (numpy.ndarray): Imagem em tons de cinza ou binarizada.
         matriz (numpy.ndarray): Elemento estruturante (kernel) para a dilatação.
+        dst (numpy.ndarray | None): Buffer de saída (pode ser o próprio gray).
 
     Returns:
         numpy.ndarray: Imagem após a dilatação.
     """
-    return cv2.dilate(gray, matriz)
+    return cv2.dilate(gray, matriz, dst=dst)
+
+def removeNoise(gray, mode='close', dst=None):
+    """
+    Remove ruído da imagem com uma abertura ou um fechamento 5x5.
+    ABERTURA (mode='open') para ruidos fora do texto.
+    FECHAMENTO (mode='close') para ruidos dentro do texto.
 
-def blur(gray):
-    return cv2.blur(gray, (5, 5))
+    Args:
+        gray (numpy.ndarray): Imagem em tons de cinza ou binarizada.
+        mode (str): 'open' ou 'close' (ver morphology).
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
 
-def blurByGaussian(gray):
+    Returns:
+        numpy.ndarray: Imagem processada com ruído reduzido.
+    """
+    return morphology(gray, mode, 'rect', 5, dst=dst)
+
+SHAPES = {
+    'rect': cv2.MORPH_RECT,
+    'ellipse': cv2.MORPH_ELLIPSE,
+    'cross': cv2.MORPH_CROSS
+}
+
+MORPHOLOGY_MODES = {
+    'erode': cv2.MORPH_ERODE,
+    'dilate': cv2.MORPH_DILATE,
+    'open': cv2.MORPH_OPEN,
+    'close': cv2.MORPH_CLOSE,
+    'gradient': cv2.MORPH_GRADIENT,
+    'tophat': cv2.MORPH_TOPHAT,
+    'blackhat': cv2.MORPH_BLACKHAT
+}
+
+@functools.lru_cache(maxsize=64)
+def structuringElement(shape='rect', width=5, height=None):
+    """
+    Elemento estruturante (kernel) em cache: cada forma/tamanho é criado uma única vez.
+
+    Args:
+        shape (str): 'rect', 'ellipse' ou 'cross'.
+        width (int): Largura do kernel.
+        height (int | None): Altura do kernel (None = igual à largura).
+
+    Raises:
+        ValueError: Caso a forma ou o tamanho sejam inválidos.
+
+    Returns:
+        numpy.ndarray: Kernel uint8 somente leitura (compartilhado entre chamadas).
+    """
+    if shape not in SHAPES:
+        raise ValueError(f'Forma inválida: {shape}. Use uma de {tuple(SHAPES)}')
+    height = width if height is None else height
+    if width < 1 or height < 1:
+        raise ValueError(f'Tamanho de kernel inválido: {width}x{height}')
+    kernel = cv2.getStructuringElement(SHAPES[shape], (width, height))
+    kernel.flags.writeable = False
+    return kernel
+
+def morphology(gray, mode='close', shape='rect', size=5, iterations=1, dst=None):
+    """
+    Operação morfológica em uma única chamada de cv2.morphologyEx.
+
+    Com kernel retangular de lados ímpares, n iterações de um kernel k x k
+    equivalem a uma passada de um kernel (n(k-1)+1) x (n(k-1)+1), então as
+    iterações viram um único kernel maior (o OpenCV já decompõe kernels
+    retangulares em passadas de linha e coluna, e o custo cresce pouco com o
+    tamanho). Com lado par a âncora não fica no centro e cada iteração desloca
+    a imagem meio pixel, então as iterações são repassadas ao OpenCV.
+
+    Args:
+        gray (numpy.ndarray): Imagem em tons de cinza ou binarizada.
+        mode (str): 'erode', 'dilate', 'open', 'close', 'gradient', 'tophat' ou 'blackhat'.
+        shape (str): Forma do kernel: 'rect', 'ellipse' ou 'cross'.
+        size (int | list[int]): Lado do kernel ou [largura, altura].
+        iterations (int): Número de repetições de cada erosão/dilatação.
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
+
+    Raises:
+        ValueError: Caso o modo, a forma ou o tamanho sejam inválidos.
+
+    Returns:
+        numpy.ndarray: Imagem processada.
+    """
+    if mode not in MORPHOLOGY_MODES:
+        raise ValueError(f'Modo inválido: {mode}. Use um de {tuple(MORPHOLOGY_MODES)}')
+    width, height = (size, size) if isinstance(size, int) else size
+    if shape == 'rect' and iterations > 1 and width % 2 and height % 2:
+        width, height = iterations * (width - 1) + 1, iterations * (height - 1) + 1
+        iterations = 1
+    kernel = structuringElement(shape, width, height)
+    return cv2.morphologyEx(gray, MORPHOLOGY_MODES[mode], kernel, dst=dst, iterations=iterations)
+
+def blur(gray, dst=None):
+    return cv2.blur(gray, (5, 5), dst=dst)
+
+def blurByGaussian(gray, dst=None):
     # Mais usado para objetos
-    return cv2.GaussianBlur(gray, (5, 5), 0)
+    return cv2.GaussianBlur(gray, (5, 5), 0, dst=dst)
 
-def blurByMedia(gray):
+def blurByMedia(gray, dst=None):
     # Mais usado para objetos
-    return cv2.medianBlur(gray, 3)
+    return cv2.medianBlur(gray, 3, dst=dst)
 
-def bilateralBlur(gray):
-    return cv2.bilateralFilter(gray, 15, 20, 45)
\ No newline at end of file
+def bilateralBlur(gray, dst=None):
+    # o bilateral não aceita dst igual à entrada
+    return cv2.bilateralFilter(gray, 15, 20, 45, dst=dst)
\ No newline at end of file
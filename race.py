@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ocrData import OcrData
+from pipeline import PreprocessingPipeline, readSpec
+from cascade import meanConfidence
+from tesseractUtils import imageToAll, remainingTime, Cancellation
+
+"""
+Corrida de variantes de pré-processamento com escolha do melhor resultado.
+
+Não dá para saber antes qual binarização funciona melhor em cada imagem.
+Aqui vários pipelines candidatos rodam sobre a mesma imagem decodificada em
+um pool de threads (o OpenCV e o Tesseract liberam o GIL), cada um passa pelo
+OCR e fica o resultado com a maior confiança média ou com mais palavras do
+dicionário. Assim que um candidato atinge a confiança de parada, os que ainda
+não começaram são cancelados e os que estão rodando são interrompidos (na
+engine 'cli' o processo tesseract é encerrado).
+
+O pool de threads vive enquanto a OcrRace existir: na engine 'capi' cada
+thread mantém a sua TessBaseAPI, então o traineddata é carregado uma vez por
+thread e não a cada imagem.
+
+Contém funções para:
+- Carregar um dicionário de palavras
+- Pontuar um resultado por confiança ou por palavras do dicionário
+- Executar a corrida de candidatos
+"""
+
+SCORES = ('confidence', 'words')
+
+DEFAULT_CANDIDATES = [
+    ['grayscale', 'binarizationOtsu'],
+    ['grayscale', {'step': 'binarizationSimple', 'threshold': 140, 'thresholdMax': 255}],
+    ['grayscale', 'binarizationAdaptive'],
+    ['grayscale', 'binarizationAdaptiveGaussiana']
+]
+
+_PUNCTUATION = '.,;:!?()[]{}"\'«»“”‘’-–—/\\|*'
+
+def loadDictionary(path):
+    """
+    Lê um dicionário com uma palavra por linha.
+
+    Args:
+        path (str): Caminho do arquivo (UTF-8).
+
+    Returns:
+        frozenset[str]: Palavras em minúsculas.
+    """
+    with open(path, encoding='utf-8') as file:
+        return frozenset(line.strip().lower() for line in file if line.strip())
+
+def dictionaryWords(result, dictionary):
+    """
+    Conta as palavras reconhecidas que existem no dicionário.
+
+    Args:
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+        dictionary (frozenset[str]): Palavras em minúsculas.
+
+    Returns:
+        int: Quantidade de palavras encontradas no dicionário.
+    """
+    table = OcrData.fromDict(result)
+    words = table['text'][table.words() & table.nonEmpty()].tolist()
+    return sum(word.strip(_PUNCTUATION).lower() in dictionary for word in words)
+
+class OcrRace:
+    """
+    Candidatos de pré-processamento executados em paralelo, vence o melhor resultado.
+
+    Serializável com pickle (o pool de threads não vai junto e é recriado no
+    destino), então pode ser enviada à OcrWorkerFarm (opção strategy).
+
+    Uso:
+        with OcrRace(score='words', dictionary=loadDictionary('palavras.txt')) as race:
+            result = race.run(img, 'por', '--tessdata-dir tessdata')
+            print(result['race']['winner'], result['race']['confidence'])
+    """
+
+    def __init__(self, candidates=None, score='confidence', dictionary=None, stopAt=90, workers=None):
+        """
+        Args:
+            candidates (list | str | None): Lista de especificações de pipeline (ou
+                PreprocessingPipeline), ou caminho de arquivo JSON/YAML / texto JSON com
+                essa lista (ou um objeto {"candidates": [...]}). Se None, usa DEFAULT_CANDIDATES.
+            score (str): 'confidence' (confiança média) ou 'words' (palavras do
+                dicionário, com a confiança como desempate).
+            dictionary (frozenset[str] | None): Palavras em minúsculas, obrigatório com score='words'.
+            stopAt (float | None): Confiança média que define um vencedor claro; ao ser
+                atingida os outros candidatos são cancelados ou interrompidos. None = roda todos.
+            workers (int | None): Threads da corrida (padrão: número de candidatos,
+                limitado a os.cpu_count()).
+
+        Raises:
+            ValueError: Caso os candidatos ou o critério sejam inválidos.
+        """
+        candidates = DEFAULT_CANDIDATES if candidates is None else readSpec(candidates)
+        if isinstance(candidates, dict):
+            candidates = candidates.get('candidates')
+        if not isinstance(candidates, list) or not candidates:
+            raise ValueError('A corrida precisa de uma lista com pelo menos um candidato')
+        if score not in SCORES:
+            raise ValueError(f'Critério inválido: {score}. Use um de {SCORES}')
+        if score == 'words' and not dictionary:
+            raise ValueError("O critério 'words' precisa de um dicionário")
+        self.candidates = [
+            candidate if isinstance(candidate, PreprocessingPipeline) else PreprocessingPipeline(candidate)
+            for candidate in candidates
+        ]
+        self.score = score
+        self.dictionary = dictionary
+        self.stopAt = stopAt
+        self.workers = workers or min(len(self.candidates), os.cpu_count() or 1)
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['executor'] = None
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Encerra o pool de threads (é recriado se run for chamado de novo).
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def describe(self):
+        """
+        Returns:
+            str: Descrição estável (usada na chave do cache).
+        """
+        dictionary = f'{len(self.dictionary)} palavras' if self.dictionary else None
+        candidates = ', '.join(candidate.describe() for candidate in self.candidates)
+        return f'race[{self.score}; {dictionary}; {self.stopAt}; {candidates}]'
+
+    def _pool(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='OcrRace')
+            return self.executor
+
+    def _attempt(self, index, img, lang, config_tesseract, osd, deadline, cancellation):
+        candidate = self.candidates[index]
+        cancellation.check()
+        start = time.perf_counter()
+        processed = candidate(img)
+        if candidate.reuseBuffers:
+            # a thread continua viva e o buffer seria reaproveitado na próxima imagem
+            processed = processed.copy()
+        preprocessTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = imageToAll(
+            processed, lang, config_tesseract, osd=osd, text=False,
+            timeout=remainingTime(deadline), cancellation=cancellation
+        )
+        ocrTime = time.perf_counter() - start
+
+        confidence = meanConfidence(result['data'])
+        words = dictionaryWords(result['data'], self.dictionary) if self.score == 'words' else None
+        return {
+            'candidate': index,
+            'confidence': confidence,
+            'words': words,
+            'preprocess': preprocessTime,
+            'ocr': ocrTime,
+            'result': result,
+            'image': processed
+        }
+
+    def _rank(self, attempt):
+        if self.score == 'words':
+            return attempt['words'], attempt['confidence']
+        return attempt['confidence'],
+
+    def run(self, img, lang, config_tesseract, osd=False, timeout=0):
+        """
+        Executa os candidatos em paralelo e devolve o melhor resultado.
+
+        O OSD (se pedido) roda só no primeiro candidato, pois a orientação não
+        depende do pré-processamento. Candidatos que falham são ignorados; se
+        todos falharem o primeiro erro é propagado. Ao atingir stopAt, a chamada
+        retorna sem esperar os candidatos interrompidos.
+
+        Args:
+            img (numpy.ndarray): Imagem original (BGR).
+            lang (str): Código do idioma.
+            config_tesseract (str): Configurações Tesseract.
+            osd (bool): Se deve detectar a orientação.
+            timeout (float): Tempo máximo da corrida inteira em segundos, contado a partir
+                desta chamada (0 = sem limite). Cada execução do Tesseract recebe o que resta.
+
+        Returns:
+            dict: Mesmas chaves de imageToAll mais 'image' (imagem pré-processada do
+            vencedor), 'timings' (pré-processamento e OCR somados entre os candidatos) e
+            'race' com 'winner', 'confidence', 'words', 'attempts' e 'cancelled'.
+        """
+        attempts = []
+        errors = []
+        osdResult = None
+        cancelled = 0
+        deadline = time.monotonic() + timeout if timeout else None
+        executor = self._pool()
+        cancellations = {}
+        for index in range(len(self.candidates)):
+            cancellation = Cancellation()
+            future = executor.submit(
+                self._attempt, index, img, lang, config_tesseract, osd and index == 0, deadline, cancellation
+            )
+            cancellations[future] = cancellation
+        pending = set(cancellations)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    attempt = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                attempts.append(attempt)
+                if attempt['candidate'] == 0:
+                    osdResult = attempt['result']['osd']
+            if pending and self.stopAt is not None and any(attempt['confidence'] >= self.stopAt for attempt in attempts):
+                for future in pending:
+                    # os que ainda não começaram saem da fila; os que estão rodando são interrompidos
+                    if not future.cancel():
+                        cancellations[future].cancel()
+                cancelled = len(pending)
+                break
+        if not attempts:
+            raise errors[0]
+
+        best = max(attempts, key=lambda attempt: (self._rank(attempt), -attempt['candidate']))
+        result = dict(best['result'])
+        result['osd'] = osdResult
+        result['image'] = best['image']
+        result['timings'] = {
+            'preprocess': sum(attempt['preprocess'] for attempt in attempts),
+            'ocr': sum(attempt['ocr'] for attempt in attempts)
+        }
+        result['race'] = {
+            'winner': best['candidate'],
+            'confidence': best['confidence'],
+            'words': best['words'],
+            'attempts': sorted(
+                ({key: attempt[key] for key in ('candidate', 'confidence', 'words', 'preprocess', 'ocr')} for attempt in attempts),
+                key=lambda attempt: attempt['candidate']
+            ),
+            'cancelled': cancelled
+        }
+        return result
@@ -0,0 +1,283 @@
+import asyncio
+import contextlib
+import os
+import shlex
+import shutil
+import sys
+import tempfile
+import pytesseract
+from PIL import Image
+from pytesseract import TesseractError, TesseractNotFoundError
+from pytesseract.pytesseract import get_errors, osd_to_dict, DEFAULT_ENCODING
+import tesseractUtils
+from tesseractUtils import toPIL, parseTsv, dataToString
+
+"""
+API assíncrona (asyncio) para o OCR com Tesseract.
+
+As funções de tesseractUtils bloqueiam o event loop enquanto o Tesseract
+roda. Aqui cada chamada executa o `tesseract` como subprocesso do asyncio
+(asyncio.create_subprocess_exec): o loop fica livre durante o OCR, o
+processo filho é encerrado se a tarefa for cancelada ou estourar o tempo, e
+um semáforo limita quantos processos rodam ao mesmo tempo. Centenas de
+requisições podem ficar pendentes dividindo um número fixo de vagas de OCR.
+
+Os argumentos, a imagem temporária (PNG via Pillow, como no pytesseract) e
+o parse dos resultados são os mesmos do caminho síncrono, então os
+resultados são idênticos aos de imageToString, imageToData, imageToOsd e
+imageToAll na engine 'cli'. Na engine 'capi' (sem subprocesso) as chamadas
+rodam em threads: o cancelamento libera a vaga, mas não interrompe o OCR já
+iniciado.
+
+Contém funções para:
+- Executar o Tesseract como subprocesso assíncrono, com cancelamento e timeout
+- Limitar a concorrência com um semáforo
+- Extrair texto, dados, OSD ou tudo de uma vez sem bloquear o event loop
+"""
+
+class AsyncTesseract:
+    """
+    Vagas de OCR compartilhadas entre as tarefas de um event loop.
+
+    Uso:
+        ocr = AsyncTesseract(concurrency=4, timeout=30)
+        text = await ocr.imageToString(img)
+        results = await asyncio.gather(*(ocr.imageToAll(img, osd=False) for img in imgs))
+    """
+
+    def __init__(self, concurrency=None, lang='por', config='--tessdata-dir tessdata', timeout=None, tesseractCmd=None):
+        """
+        Args:
+            concurrency (int | None): Máximo de processos tesseract simultâneos
+                (padrão: os.cpu_count()). As demais chamadas aguardam uma vaga.
+            lang (str): Idioma padrão das chamadas.
+            config (str): Configurações Tesseract padrão das chamadas.
+            timeout (float | None): Tempo máximo padrão de cada execução do Tesseract
+                em segundos (None = sem limite). Não inclui a espera por uma vaga.
+            tesseractCmd (str | None): Caminho do executável (padrão: o do pytesseract).
+
+        Raises:
+            ValueError: Caso concurrency seja menor que 1.
+        """
+        concurrency = concurrency or os.cpu_count() or 1
+        if concurrency < 1:
+            raise ValueError(f'Concorrência inválida: {concurrency}')
+        self.concurrency = concurrency
+        self.lang = lang
+        self.config = config
+        self.timeout = timeout
+        self.tesseractCmd = tesseractCmd
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+
+    async def imageToString(self, image, lang=None, config_tesseract=None, timeout=None):
+        """
+        Extrai texto da imagem sem bloquear o event loop.
+
+        Args:
+            image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+            lang (str | None): Código do idioma (padrão: o da instância).
+            config_tesseract (str | None): Configurações Tesseract (padrão: as da instância).
+            timeout (float | None): Tempo máximo em segundos (padrão: o da instância).
+
+        Raises:
+            TimeoutError: Caso o Tesseract estoure o tempo (o processo é encerrado).
+            TesseractError: Caso o Tesseract termine com erro.
+
+        Returns:
+            str: Texto extraído.
+        """
+        if self._inProcess():
+            return await self._inThread(tesseractUtils.imageToString, image, self._lang(lang), self._config(config_tesseract))
+        outputs = await self._run(image, self._lang(lang), self._config(config_tesseract), ['txt'], ['txt'], timeout)
+        return outputs['txt']
+
+    async def imageToData(self, image, lang=None, config_tesseract=None, timeout=None):
+        """
+        Extrai os dados por palavra (image_to_data) sem bloquear o event loop.
+
+        Args:
+            image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+            lang (str | None): Código do idioma (padrão: o da instância).
+            config_tesseract (str | None): Configurações Tesseract (padrão: as da instância).
+            timeout (float | None): Tempo máximo em segundos (padrão: o da instância).
+
+        Raises:
+            TimeoutError: Caso o Tesseract estoure o tempo (o processo é encerrado).
+            TesseractError: Caso o Tesseract termine com erro.
+
+        Returns:
+            OcrData: Colunas do image_to_data (ver tesseractUtils.parseTsv).
+        """
+        if self._inProcess():
+            return await self._inThread(tesseractUtils.imageToData, image, self._lang(lang), self._config(config_tesseract))
+        config = f'-c tessedit_create_tsv=1 {self._config(config_tesseract).strip()}'
+        outputs = await self._run(image, self._lang(lang), config, [], ['tsv'], timeout, binary=True)
+        return parseTsv(outputs['tsv'])
+
+    async def imageToOsd(self, image, config_tesseract=None, timeout=None):
+        """
+        Detecta a orientação (OSD) sem bloquear o event loop.
+
+        Args:
+            image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+            config_tesseract (str | None): Configurações Tesseract (padrão: as da instância;
+                só '--tessdata-dir' e '--dpi' são usados, ver tesseractUtils.osdConfig).
+            timeout (float | None): Tempo máximo em segundos (padrão: o da instância).
+
+        Raises:
+            TimeoutError: Caso o Tesseract estoure o tempo (o processo é encerrado).
+            TesseractError: Caso o Tesseract termine com erro.
+
+        Returns:
+            str: Informações OSD da imagem (mesmo formato de tesseractUtils.imageToOsd).
+        """
+        if self._inProcess():
+            return await self._inThread(tesseractUtils.imageToOsd, image, self._config(config_tesseract))
+        config = f'--psm 0 {tesseractUtils.osdConfig(self._config(config_tesseract))}'
+        outputs = await self._run(image, 'osd', config, [], ['osd'], timeout)
+        return outputs['osd']
+
+    async def imageToAll(self, image, lang=None, config_tesseract=None, osd=True, text=True, timeout=None):
+        """
+        Extrai texto, dados por palavra e OSD sem bloquear o event loop.
+
+        Mesmo comportamento de tesseractUtils.imageToAll: texto e TSV saem da mesma
+        execução e o OSD reaproveita a imagem temporária em uma execução '--psm 0',
+        na mesma vaga do semáforo.
+
+        Args:
+            image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+            lang (str | None): Código do idioma (padrão: o da instância).
+            config_tesseract (str | None): Configurações Tesseract (padrão: as da instância).
+            osd (bool): Se deve detectar a orientação.
+            text (bool): Se deve pedir o texto ao Tesseract (senão usa dataToString).
+            timeout (float | None): Tempo máximo de cada execução em segundos (padrão: o da instância).
+
+        Raises:
+            TimeoutError: Caso o Tesseract estoure o tempo (o processo é encerrado).
+            TesseractError: Caso o reconhecimento termine com erro.
+
+        Returns:
+            dict: Chaves 'text', 'data' (OcrData) e 'osd' (dict ou None).
+        """
+        lang, config = self._lang(lang), self._config(config_tesseract)
+        if self._inProcess():
+            return await self._inThread(tesseractUtils.imageToAll, image, lang, config, osd, text)
+        config = f'-c tessedit_create_txt={int(text)} -c tessedit_create_tsv=1 {config.strip()}'
+        outputs = await self._run(
+            image, lang, config, [], ['txt', 'tsv'] if text else ['tsv'], timeout, binary=True, osd=osd
+        )
+        data = parseTsv(outputs['tsv'])
+        osdText = outputs.get('osd')
+        return {
+            'text': outputs['txt'].decode(DEFAULT_ENCODING) if text else dataToString(data),
+            'data': data,
+            'osd': osd_to_dict(osdText.decode(DEFAULT_ENCODING)) if osdText else None
+        }
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'concurrency' (vagas), 'running' (processos em execução) e
+            'waiting' (chamadas aguardando uma vaga).
+        """
+        return {'concurrency': self.concurrency, 'running': self.running, 'waiting': self.waiting}
+
+    def _lang(self, lang):
+        return self.lang if lang is None else lang
+
+    def _config(self, config_tesseract):
+        return self.config if config_tesseract is None else config_tesseract
+
+    def _inProcess(self):
+        return tesseractUtils.getEngine() == 'capi'
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+    async def _inThread(self, func, *args):
+        async with self._slot():
+            return await asyncio.to_thread(func, *args)
+
+    async def _run(self, image, lang, config, extensions, outputs, timeout, binary=False, osd=False):
+        timeout = self.timeout if timeout is None else timeout
+        async with self._slot():
+            directory = tempfile.mkdtemp(prefix='tess_')
+            try:
+                inputFile = os.path.join(directory, 'input.png')
+                # a codificação PNG roda em uma thread para não travar o loop com imagens grandes
+                await asyncio.to_thread(_savePng, image, inputFile)
+                base = os.path.join(directory, 'output')
+                await self._exec([inputFile, base, '-l', lang, *_splitConfig(config), *extensions], timeout)
+                results = {ext: _readOutput(f'{base}.{ext}', binary) for ext in outputs}
+                if osd:
+                    try:
+                        osdArgs = _splitConfig(tesseractUtils.osdConfig(config))
+                        await self._exec([inputFile, base, '-l', 'osd', '--psm', '0', *osdArgs], timeout)
+                        results['osd'] = _readOutput(f'{base}.osd', binary)
+                    except TesseractError:
+                        results['osd'] = None
+                return results
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    async def _exec(self, args, timeout):
+        command = self.tesseractCmd or pytesseract.pytesseract.tesseract_cmd
+        try:
+            process = await asyncio.create_subprocess_exec(
+                command, *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise TesseractNotFoundError() from None
+        try:
+            _, errors = await asyncio.wait_for(process.communicate(), timeout or None)
+        except asyncio.TimeoutError:
+            await _kill(process)
+            raise TimeoutError(f'O Tesseract excedeu o tempo limite de {timeout}s') from None
+        except asyncio.CancelledError:
+            await _kill(process)
+            raise
+        if process.returncode:
+            raise TesseractError(process.returncode, get_errors(errors))
+
+async def _kill(process):
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    # aguarda o processo sem aceitar um novo cancelamento, para não deixar zumbis
+    await asyncio.shield(process.wait())
+
+def _savePng(image, path):
+    image = toPIL(image) if not isinstance(image, Image.Image) else image
+    if 'A' in image.getbands():
+        # mesmo tratamento do pytesseract: alfa vira fundo branco
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, (0, 0), image.getchannel('A'))
+        image = background
+    image.save(path, format='PNG', compress_level=1)
+
+def _splitConfig(config):
+    return shlex.split(config, posix=sys.platform != 'win32')
+
+def _readOutput(path, binary):
+    with open(path, 'rb') as file:
+        content = file.read()
+    return content if binary else content.decode(DEFAULT_ENCODING)
@@ -0,0 +1,452 @@
+import ctypes
+import ctypes.util
+import os
+import shlex
+import threading
+import numpy as np
+from PIL import Image
+from pytesseract import TesseractError
+
+"""
+Engine Tesseract em processo, usando a API C da libtesseract via ctypes.
+
+Diferente do pytesseract, que grava a imagem em um arquivo temporário e cria
+um novo processo `tesseract` a cada chamada (recarregando o traineddata),
+aqui cada thread mantém uma instância TessBaseAPI já inicializada por
+(tessdata, idioma, oem) e envia a imagem direto da memória.
+
+Contém funções para:
+- Carregar a libtesseract
+- Interpretar a string de configuração no formato da linha de comando
+- Extrair texto, TSV e OSD usando instâncias persistentes
+"""
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n'
+PAGE_SEPARATOR = '\f'
+
+_library = None
+_libraryLock = threading.Lock()
+_local = threading.local()
+
+def loadLibrary(libraryPath=None):
+    """
+    Carrega a libtesseract (uma única vez por processo) e declara as assinaturas usadas.
+
+    Args:
+        libraryPath (str | None): Caminho da biblioteca. Se None, usa a variável de
+            ambiente TESSERACT_LIB ou procura 'tesseract' no sistema.
+
+    Raises:
+        OSError: Caso a biblioteca não seja encontrada.
+
+    Returns:
+        ctypes.CDLL: Biblioteca carregada.
+    """
+    global _library
+    with _libraryLock:
+        if _library is not None:
+            return _library
+
+        path = libraryPath or os.environ.get('TESSERACT_LIB') or ctypes.util.find_library('tesseract')
+        if not path:
+            raise OSError('libtesseract não encontrada, defina TESSERACT_LIB com o caminho da biblioteca')
+        lib = ctypes.CDLL(path)
+
+        handle = ctypes.c_void_p
+        lib.TessBaseAPICreate.restype = handle
+        lib.TessBaseAPICreate.argtypes = []
+        lib.TessBaseAPIDelete.restype = None
+        lib.TessBaseAPIDelete.argtypes = [handle]
+        lib.TessBaseAPIEnd.restype = None
+        lib.TessBaseAPIEnd.argtypes = [handle]
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPIInit2.argtypes = [handle, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        lib.TessBaseAPISetVariable.restype = ctypes.c_int
+        lib.TessBaseAPISetVariable.argtypes = [handle, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPIGetStringVariable.restype = ctypes.c_char_p
+        lib.TessBaseAPIGetStringVariable.argtypes = [handle, ctypes.c_char_p]
+        lib.TessBaseAPIGetIntVariable.restype = ctypes.c_int
+        lib.TessBaseAPIGetIntVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+        lib.TessBaseAPIGetBoolVariable.restype = ctypes.c_int
+        lib.TessBaseAPIGetBoolVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_int)]
+        lib.TessBaseAPIGetDoubleVariable.restype = ctypes.c_int
+        lib.TessBaseAPIGetDoubleVariable.argtypes = [handle, ctypes.c_char_p, ctypes.POINTER(ctypes.c_double)]
+        lib.TessBaseAPISetPageSegMode.restype = None
+        lib.TessBaseAPISetPageSegMode.argtypes = [handle, ctypes.c_int]
+        lib.TessBaseAPISetImage.restype = None
+        lib.TessBaseAPISetImage.argtypes = [handle, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.restype = None
+        lib.TessBaseAPISetSourceResolution.argtypes = [handle, ctypes.c_int]
+        lib.TessBaseAPIRecognize.restype = ctypes.c_int
+        lib.TessBaseAPIRecognize.argtypes = [handle, ctypes.c_void_p]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetUTF8Text.argtypes = [handle]
+        lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetTsvText.argtypes = [handle, ctypes.c_int]
+        lib.TessBaseAPIDetectOrientationScript.restype = ctypes.c_int
+        lib.TessBaseAPIDetectOrientationScript.argtypes = [
+            handle,
+            ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_float),
+            ctypes.POINTER(ctypes.c_char_p),
+            ctypes.POINTER(ctypes.c_float),
+        ]
+        lib.TessBaseAPIClear.restype = None
+        lib.TessBaseAPIClear.argtypes = [handle]
+        lib.TessDeleteText.restype = None
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+
+        _library = lib
+        return lib
+
+def parseConfig(config_tesseract):
+    """
+    Interpreta a string de configuração no mesmo formato aceito pela linha de comando.
+
+    Suporta '--tessdata-dir', '--psm', '--oem', '--dpi' e '-c variavel=valor'.
+
+    Args:
+        config_tesseract (str): Configurações Tesseract (ex: '--tessdata-dir tessdata --psm 6').
+
+    Raises:
+        ValueError: Caso a configuração tenha uma opção não suportada pela API.
+
+    Returns:
+        dict: Chaves 'datapath', 'psm', 'oem', 'dpi' e 'variables'.
+    """
+    options = {'datapath': None, 'psm': None, 'oem': 3, 'dpi': None, 'variables': {}}
+    args = shlex.split(config_tesseract or '', posix=os.name != 'nt')
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--tessdata-dir', '--psm', '--oem', '--dpi', '-c') and i + 1 >= len(args):
+            raise ValueError(f'Opção sem valor na configuração do Tesseract: {arg}')
+        match arg:
+            case '--tessdata-dir':
+                options['datapath'] = args[i + 1]
+            case '--psm':
+                options['psm'] = int(args[i + 1])
+            case '--oem':
+                options['oem'] = int(args[i + 1])
+            case '--dpi':
+                options['dpi'] = int(args[i + 1])
+            case '-c':
+                name, _, value = args[i + 1].partition('=')
+                options['variables'][name] = value
+            case _:
+                raise ValueError(f'Opção não suportada pela engine capi: {arg}')
+        i += 2
+    return options
+
+class TesseractApi:
+    """
+    Instância TessBaseAPI inicializada uma única vez para um idioma e tessdata.
+
+    Não é thread-safe: use getApi para obter a instância da thread atual.
+    """
+
+    def __init__(self, lang, datapath=None, oem=3, libraryPath=None):
+        self.lib = loadLibrary(libraryPath)
+        self.handle = self.lib.TessBaseAPICreate()
+        self.lang = lang
+        # valores originais das variáveis alteradas por '-c' na última chamada
+        self.overrides = {}
+        datapath = os.path.abspath(datapath).encode() if datapath else None
+        status = self.lib.TessBaseAPIInit2(self.handle, datapath, lang.encode(), oem)
+        if status != 0:
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+            raise TesseractError(status, f'Falha ao inicializar a TessBaseAPI com idioma {lang}')
+
+    def close(self):
+        """
+        Libera a instância TessBaseAPI.
+        """
+        if self.handle:
+            self.lib.TessBaseAPIEnd(self.handle)
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+
+    def __del__(self):
+        self.close()
+
+    def setImage(self, image, options):
+        """
+        Envia a imagem para a API direto da memória e aplica as opções da chamada.
+
+        A TessBaseAPI copia os pixels durante o SetImage, então o buffer não
+        precisa continuar vivo depois desta chamada.
+
+        Args:
+            image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+            options (dict): Resultado de parseConfig.
+        """
+        pixels = imageToBuffer(image)
+        height, width = pixels.shape[:2]
+        bytesPerPixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+
+        self.lib.TessBaseAPIClear(self.handle)
+        self.applyVariables(options['variables'])
+        # 3 = PSM_AUTO, padrão da linha de comando
+        self.lib.TessBaseAPISetPageSegMode(self.handle, 3 if options['psm'] is None else options['psm'])
+        self.lib.TessBaseAPISetImage(
+            self.handle,
+            pixels.ctypes.data,
+            width,
+            height,
+            bytesPerPixel,
+            pixels.strides[0]
+        )
+        if options['dpi']:
+            self.lib.TessBaseAPISetSourceResolution(self.handle, options['dpi'])
+
+    def applyVariables(self, variables):
+        """
+        Aplica as variáveis '-c' da chamada, restaurando as da chamada anterior.
+
+        A instância é reaproveitada entre chamadas e o SetVariable fica gravado
+        nela. Sem restaurar, um tessedit_char_whitelist de uma chamada valeria
+        para todas as seguintes da thread, o que nunca acontece na linha de
+        comando (cada processo começa com os valores padrão).
+
+        Args:
+            variables (dict[str, str]): Variáveis da chamada (chave 'variables' de parseConfig).
+        """
+        for name in [name for name in self.overrides if name not in variables]:
+            self.lib.TessBaseAPISetVariable(self.handle, name.encode(), self.overrides.pop(name).encode())
+        for name, value in variables.items():
+            if name not in self.overrides:
+                previous = self.getVariable(name)
+                if previous is not None:
+                    self.overrides[name] = previous
+            self.lib.TessBaseAPISetVariable(self.handle, name.encode(), value.encode())
+
+    def getVariable(self, name):
+        """
+        Args:
+            name (str): Nome da variável do Tesseract.
+
+        Returns:
+            str | None: Valor atual no formato aceito pelo SetVariable, ou None se a variável não existir.
+        """
+        key = name.encode()
+        value = self.lib.TessBaseAPIGetStringVariable(self.handle, key)
+        if value is not None:
+            return value.decode()
+        integer = ctypes.c_int()
+        if self.lib.TessBaseAPIGetIntVariable(self.handle, key, ctypes.byref(integer)):
+            return str(integer.value)
+        if self.lib.TessBaseAPIGetBoolVariable(self.handle, key, ctypes.byref(integer)):
+            return str(int(bool(integer.value)))
+        double = ctypes.c_double()
+        if self.lib.TessBaseAPIGetDoubleVariable(self.handle, key, ctypes.byref(double)):
+            return repr(double.value)
+        return None
+
+    def recognize(self):
+        """
+        Executa o reconhecimento da imagem atual.
+
+        Raises:
+            TesseractError: Caso o reconhecimento falhe.
+        """
+        status = self.lib.TessBaseAPIRecognize(self.handle, None)
+        if status != 0:
+            raise TesseractError(status, 'Falha no reconhecimento da TessBaseAPI')
+
+    def text(self):
+        """
+        Returns:
+            str: Texto reconhecido, no mesmo formato do arquivo .txt da linha de comando.
+        """
+        return self._takeText(self.lib.TessBaseAPIGetUTF8Text(self.handle)) + PAGE_SEPARATOR
+
+    def tsv(self):
+        """
+        Returns:
+            str: Dados por palavra no formato TSV da linha de comando, com cabeçalho.
+        """
+        return TSV_HEADER + self._takeText(self.lib.TessBaseAPIGetTsvText(self.handle, 0))
+
+    def osd(self):
+        """
+        Returns:
+            str: Informações OSD no mesmo formato do arquivo .osd da linha de comando.
+
+        Raises:
+            TesseractError: Caso a detecção de orientação falhe.
+        """
+        degrees = ctypes.c_int()
+        orientationConf = ctypes.c_float()
+        script = ctypes.c_char_p()
+        scriptConf = ctypes.c_float()
+        ok = self.lib.TessBaseAPIDetectOrientationScript(
+            self.handle,
+            ctypes.byref(degrees),
+            ctypes.byref(orientationConf),
+            ctypes.byref(script),
+            ctypes.byref(scriptConf)
+        )
+        if not ok:
+            raise TesseractError(1, 'Falha na detecção de orientação (OSD) da TessBaseAPI')
+        return (
+            'Page number: 0\n'
+            f'Orientation in degrees: {degrees.value}\n'
+            f'Rotate: {(360 - degrees.value) % 360}\n'
+            f'Orientation confidence: {orientationConf.value:.2f}\n'
+            f'Script: {(script.value or b"").decode()}\n'
+            f'Script confidence: {scriptConf.value:.2f}\n'
+        )
+
+    def _takeText(self, pointer):
+        if not pointer:
+            return ''
+        try:
+            return ctypes.string_at(pointer).decode('utf-8')
+        finally:
+            self.lib.TessDeleteText(pointer)
+
+def imageToBuffer(image):
+    """
+    Converte a imagem para um array uint8 contíguo aceito pela TessBaseAPI.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+
+    Raises:
+        TypeError: Caso o tipo de imagem não seja suportado.
+
+    Returns:
+        numpy.ndarray: Array 2D (cinza) ou 3D com 3/4 canais.
+    """
+    if isinstance(image, Image.Image):
+        if image.mode not in ('L', 'RGB', 'RGBA'):
+            image = image.convert('RGB')
+        image = np.asarray(image)
+    if not isinstance(image, np.ndarray):
+        raise TypeError('Tipo de imagem não suportado')
+    if image.dtype == np.bool_:
+        image = image.astype(np.uint8) * 255
+    elif image.dtype != np.uint8:
+        image = image.astype(np.uint8)
+    if image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
+    return np.ascontiguousarray(image)
+
+def getApi(lang, datapath=None, oem=3):
+    """
+    Retorna a instância TessBaseAPI da thread atual, criando-a apenas na primeira chamada.
+
+    Args:
+        lang (str): Código do idioma (ex: 'por').
+        datapath (str | None): Diretório tessdata.
+        oem (int): Modo da engine OCR.
+
+    Returns:
+        TesseractApi: Instância inicializada.
+    """
+    apis = getattr(_local, 'apis', None)
+    if apis is None:
+        apis = _local.apis = {}
+    key = (lang, datapath, oem)
+    if key not in apis:
+        apis[key] = TesseractApi(lang, datapath, oem)
+    return apis[key]
+
+def imageToString(image, lang, config_tesseract):
+    """
+    Extrai texto da imagem usando a instância persistente da thread.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        lang (str): Código do idioma (ex: 'por').
+        config_tesseract (str): Configurações Tesseract.
+
+    Returns:
+        str: Texto extraído.
+    """
+    options = parseConfig(config_tesseract)
+    api = getApi(lang, options['datapath'], options['oem'])
+    api.setImage(image, options)
+    api.recognize()
+    return api.text()
+
+def imageToTsv(image, lang, config_tesseract):
+    """
+    Extrai os dados por palavra no formato TSV usando a instância persistente da thread.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        lang (str): Código do idioma.
+        config_tesseract (str): Configurações Tesseract.
+
+    Returns:
+        str: TSV com cabeçalho, igual ao gerado pela linha de comando.
+    """
+    options = parseConfig(config_tesseract)
+    api = getApi(lang, options['datapath'], options['oem'])
+    api.setImage(image, options)
+    api.recognize()
+    return api.tsv()
+
+def osdDatapath(datapath):
+    """
+    Escolhe o tessdata usado pelo OSD.
+
+    O tessdata do projeto traz só eng e por: se o diretório informado não tem
+    osd.traineddata, o OSD usa o tessdata padrão da instalação.
+
+    Args:
+        datapath (str | None): Diretório tessdata da configuração.
+
+    Returns:
+        str | None: O próprio datapath, ou None (tessdata padrão) se faltar osd.traineddata nele.
+    """
+    if datapath and os.path.isfile(os.path.join(datapath, 'osd.traineddata')):
+        return datapath
+    return None
+
+def imageToOsd(image, config_tesseract=''):
+    """
+    Retorna informações de orientação usando uma instância persistente com o idioma 'osd'.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        config_tesseract (str): Configurações Tesseract ('--tessdata-dir' só é usado
+            se tiver osd.traineddata, ver osdDatapath).
+
+    Returns:
+        str: Informações OSD da imagem.
+    """
+    options = parseConfig(config_tesseract)
+    options['psm'] = 0
+    api = getApi('osd', osdDatapath(options['datapath']), options['oem'])
+    api.setImage(image, options)
+    return api.osd()
+
+def imageToAll(image, lang, config_tesseract, osd=True, text=True):
+    """
+    Executa OSD e um único reconhecimento, retornando texto e TSV da mesma passada.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        lang (str): Código do idioma.
+        config_tesseract (str): Configurações Tesseract.
+        osd (bool): Se deve detectar a orientação.
+        text (bool): Se deve extrair o texto além do TSV.
+
+    Returns:
+        tuple[str | None, str, str | None]: Texto (None quando text=False), TSV e
+        OSD (None quando osd=False ou quando a orientação não puder ser detectada).
+    """
+    options = parseConfig(config_tesseract)
+    osdText = None
+    if osd:
+        try:
+            osdText = imageToOsd(image, config_tesseract)
+        except TesseractError:
+            osdText = None
+    api = getApi(lang, options['datapath'], options['oem'])
+    api.setImage(image, options)
+    api.recognize()
+    return api.text() if text else None, api.tsv(), osdText
@@ -2,22 +2,69 @@ import pytesseract
 import numpy as np
 import cv2 # OpenCV
 import re
+import os
+import contextlib
+import functools
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
 from PIL import Image, ImageFont, ImageDraw
-from pytesseract import Output
+from pytesseract import Output, TesseractError
+import tesseractCapi
+from ocrData import OcrData, INT_COLUMNS
+from extraction import Extractor, PATTERNS
+from pageLayout import PageLayout
 
 """
 Módulo utilitário para leitura, processamento e anotação de imagens com OpenCV e Tesseract.
 
 Contém funções para:
 - Ler imagens com OpenCV ou PIL
+- Ler e decodificar uma imagem uma única vez e compartilhar views entre as etapas
 - Preparar janelas de exibição
 - Redimensionar imagens
 - Mostrar imagens
-- Desenhar caixas e textos sobre imagens
-- Extrair texto e dados usando Tesseract
-- Buscar padrões via regex
+- Desenhar caixas e textos sobre imagens (fontes em cache e uma única conversão para PIL)
+- Extrair texto e dados usando Tesseract (TSV lido direto para colunas numpy)
+- Extrair texto, dados e OSD em uma única passada, com prazo e cancelamento
+- Reconstruir o texto a partir do resultado de image_to_data
+- Listar as palavras reconhecidas e suas caixas
+- Buscar padrões via regex (campos extraídos com extraction.Extractor)
+- Escolher a engine do Tesseract ('cli' via pytesseract ou 'capi' em processo)
 """
 
+ENGINES = ('cli', 'capi')
+DATE_EXTRACTOR = Extractor({'date': PATTERNS['date']})
+_engine = 'cli'
+
+def setEngine(name):
+    """
+    Define a engine usada por imageToString, imageToData e imageToOsd.
+
+    - 'cli': pytesseract, um processo `tesseract` por chamada.
+    - 'capi': libtesseract em processo, com uma instância inicializada por thread.
+
+    Args:
+        name (str): Nome da engine ('cli' ou 'capi').
+
+    Raises:
+        ValueError: Caso a engine não exista.
+    """
+    global _engine
+    if name not in ENGINES:
+        raise ValueError(f"Engine inválida: {name}. Use uma de {ENGINES}")
+    _engine = name
+
+def getEngine():
+    """
+    Returns:
+        str: Nome da engine atual.
+    """
+    return _engine
+
 def readImageWithOpenCV(pathImage):
     """
     Lê uma imagem usando OpenCV.
@@ -33,7 +80,7 @@ def readImageWithOpenCV(pathImage):
     """
     img = cv2.imread(pathImage)
     if img is None:
-        raise FileNotFoundError(f"Imagem não encontrada: {pathImage}", end='\n\n')
+        raise FileNotFoundError(f"Imagem não encontrada: {pathImage}")
     return img
 
 def readImageWithPIL(pathImage):
@@ -49,6 +96,83 @@ def readImageWithPIL(pathImage):
     img = Image.open(pathImage)
     return img
 
+def toPIL(image):
+    """
+    Converte um array numpy em imagem PIL evitando cópias quando possível.
+
+    Imagens de um canal (uint8 contíguas) viram uma imagem 'L' que compartilha
+    a memória do array. Imagens de 3 canais são sempre copiadas, pois o Pillow
+    guarda RGB com 4 bytes por pixel.
+
+    Args:
+        image (numpy.ndarray): Imagem em escala de cinza ou RGB.
+
+    Returns:
+        PIL.Image.Image: Imagem PIL.
+    """
+    if image.ndim == 2 and image.dtype == np.uint8 and image.flags['C_CONTIGUOUS']:
+        return Image.frombuffer('L', (image.shape[1], image.shape[0]), image, 'raw', 'L', 0, 1)
+    return Image.fromarray(image)
+
+class LoadedImage:
+    """
+    Imagem lida do disco (ou recebida em bytes) e decodificada uma única vez.
+
+    Todas as etapas (OSD, pré-processamento, OCR e passos baseados em PIL)
+    devem usar as views desta instância em vez de reler o arquivo.
+
+    Attributes:
+        path (str | None): Caminho de origem, se houver.
+        data (bytes): Conteúdo do arquivo, lido uma única vez.
+        bgr (numpy.ndarray): Pixels decodificados em BGR, como no cv2.imread.
+    """
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.data = data
+        self.bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if self.bgr is None:
+            raise ValueError(f"Imagem inválida ou formato não suportado: {path or '<bytes>'}")
+
+    def rgb(self):
+        """
+        Returns:
+            numpy.ndarray: View RGB dos mesmos pixels (sem cópia, com stride negativo nos canais).
+        """
+        return self.bgr[:, :, ::-1]
+
+    def pil(self):
+        """
+        Returns:
+            PIL.Image.Image: Imagem PIL em RGB (o Pillow sempre copia imagens de 3 canais).
+        """
+        return Image.fromarray(self.rgb())
+
+def loadImage(source):
+    """
+    Lê o arquivo uma única vez e decodifica para numpy.
+
+    Args:
+        source (str | bytes | LoadedImage): Caminho, conteúdo do arquivo ou imagem já carregada.
+
+    Raises:
+        FileNotFoundError: Caso o caminho não exista.
+        ValueError: Caso o conteúdo não seja uma imagem válida.
+
+    Returns:
+        LoadedImage: Imagem carregada.
+    """
+    if isinstance(source, LoadedImage):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return LoadedImage(bytes(source))
+    try:
+        with open(source, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Imagem não encontrada: {source}")
+    return LoadedImage(data, source)
+
 def prepareWindow(image):
     """
     Cria e ajusta uma janela OpenCV para exibir a imagem.
@@ -96,7 +220,7 @@ def textBox(result, img, i, color = (255, 100, 0)):
     Desenha um retângulo em volta de um texto identificado pelo Tesseract.
 
     Args:
-        result (dict): Resultado da função image_to_data do Tesseract.
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
         img (numpy.ndarray): Imagem onde desenhar.
         i (int): Índice do texto no resultado.
         color (tuple[int, int, int]): Cor do retângulo (B, G, R).
@@ -104,19 +228,46 @@ def textBox(result, img, i, color = (255, 100, 0)):
     Returns:
         tuple[int, int, numpy.ndarray]: Coordenadas x, y do retângulo e a imagem modificada.
     """
-    x = result['left'][i]
-    y = result['top'][i]
-    w = result['width'][i]
-    h = result['height'][i]
+    box = (int(result['left'][i]), int(result['top'][i]), int(result['width'][i]), int(result['height'][i]))
+    return drawRectangle(img, box, color)
+
+def drawRectangle(img, box, color = (255, 100, 0)):
+    """
+    Desenha um retângulo a partir de uma caixa (left, top, width, height).
+
+    Args:
+        img (numpy.ndarray): Imagem onde desenhar.
+        box (tuple[int, int, int, int]): Caixa a desenhar.
+        color (tuple[int, int, int]): Cor do retângulo (B, G, R).
 
+    Returns:
+        tuple[int, int, numpy.ndarray]: Coordenadas x, y do retângulo e a imagem modificada.
+    """
+    x, y, w, h = box
     cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
-    # cv2.putText(img, result['text'][i], (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 0, 225))
+    # cv2.putText(img, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 0, 225))
     return x, y, img
 
+@functools.lru_cache(maxsize=32)
+def loadFont(font, sizeFont):
+    """
+    Carrega uma fonte TTF uma única vez por processo para cada (arquivo, tamanho).
+
+    Args:
+        font (str): Caminho para arquivo de fonte TTF.
+        sizeFont (int): Tamanho da fonte.
+
+    Returns:
+        PIL.ImageFont.FreeTypeFont: Fonte carregada.
+    """
+    return ImageFont.truetype(font, sizeFont)
+
 def writeText(text, x, y, img, font, sizeFont, fill):
     """
     Escreve texto sobre a imagem usando Pillow.
 
+    Para vários textos na mesma imagem use writeTexts, que converte a imagem uma única vez.
+
     Args:
         text (str): Texto a escrever.
         x (int): Posição horizontal.
@@ -129,48 +280,92 @@ def writeText(text, x, y, img, font, sizeFont, fill):
     Returns:
         numpy.ndarray: Imagem com o texto desenhado.
     """
-    font = ImageFont.truetype(font, sizeFont)
-    imgPil = Image.fromarray(img)
-    draw = ImageDraw.Draw(imgPil)
+    return writeTexts(img, [(text, x, y, font, sizeFont, fill)])
 
-    pos = (x, y - sizeFont)
+def writeTexts(img, labels):
+    """
+    Escreve vários textos sobre a imagem com uma única conversão numpy -> PIL -> numpy.
+
+    Args:
+        img (numpy.ndarray): Imagem em que escrever.
+        labels (Iterable[tuple]): Tuplas (text, x, y, font, sizeFont, fill), com os
+            mesmos significados dos argumentos de writeText.
 
-    draw.text(pos, text, font=font, fill=fill)
+    Returns:
+        numpy.ndarray: Imagem com os textos desenhados.
+    """
+    imgPil = Image.fromarray(img)
+    draw = ImageDraw.Draw(imgPil)
+    for text, x, y, font, sizeFont, fill in labels:
+        draw.text((x, y - sizeFont), text, font=loadFont(font, sizeFont), fill=fill)
     return np.array(imgPil)
 
-def travelImage(img, result, minConfi, type):
+def travelImage(img, result, minConfi, type, extractor=None, level='word'):
     """
     Percorre os resultados do Tesseract e desenha caixas e textos conforme confiança mínima.
 
+    As palavras são escolhidas com máscaras vetorizadas (OcrData). As caixas
+    são desenhadas direto no array e os textos são acumulados e escritos
+    todos de uma vez no final (writeTexts), por cima das caixas.
+
+    No tipo 2 os campos são procurados no texto da página inteira pelo
+    extractor (padrão: datas), então valores quebrados em várias palavras
+    também são encontrados; as palavras cobertas ficam em verde.
+
+    Imagens em escala de cinza são convertidas para BGR antes de anotar.
+
+    Com level 'line', 'paragraph' ou 'block' as caixas (e, no tipo 1, os textos)
+    são desenhadas por linha/parágrafo/bloco da PageLayout, filtrando pela
+    confiança média das palavras de cada um.
+
     Args:
         img (numpy.ndarray): Imagem original.
-        result (dict): Resultado da função image_to_data do Tesseract.
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
         minConfi (int): Confiança mínima para considerar o texto.
-        type (int): Tipo de processamento (1 ou 2).
+        type (int): Tipo de processamento (1 = todas as palavras, 2 = campos extraídos).
+        extractor (Extractor | None): Padrões usados no tipo 2 (padrão: DATE_EXTRACTOR).
+        level (str): Nível das caixas ('word', 'line', 'paragraph' ou 'block').
 
     Returns:
         tuple[list[str], numpy.ndarray]: Lista de textos extraídos e imagem anotada.
     """
-    font = 'fontes\calibri.ttf'
+    font = os.path.join('fontes', 'calibri.ttf')
     data = []
-    imgCopy = img.copy()
-    for i in range(0, len(result['text'])):
-        trust = int(result['conf'][i])
-        text = result['text'][i]
-        if trust > minConfi:
-            if not text.isspace() and len(text) > 0:
-                match type:
-                    case 1:
-                        x, y, img = textBox(result, imgCopy, i)
-                        imgCopy = writeText(text, x, y, imgCopy, font, 15, (255, 0, 0))
-                    case 2:
-                        value = findWithRegex(result['text'][i], r"\b([0-3]?[0-9])/([0-1]?[0-9])/([0-9]{4})\b")
-                        if value:
-                            x, y, img = textBox(result, imgCopy, i, (0, 255, 0))
-                            imgCopy = writeText(text, x, y, imgCopy, font, 15, (0, 255, 0))
-                            data.append(text)
-                        else:
-                            x, y, img = textBox(result, imgCopy, i)
+    labels = []
+    # caixas e textos coloridos precisam de 3 canais
+    imgCopy = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR) if img.ndim == 2 else img.copy()
+    result = OcrData.fromDict(result)
+    if level == 'word':
+        units = [
+            ((int(result['left'][i]), int(result['top'][i]), int(result['width'][i]), int(result['height'][i])), str(result['text'][i]), (int(i),))
+            for i in result.indices(result.confident(minConfi) & result.nonEmpty())
+        ]
+    else:
+        units = [
+            (node.box, node.text.split('\n', 1)[0], tuple(word.index for word in node.iter('word')))
+            for node in PageLayout(result).levels[level]
+            if node.conf > minConfi and node.text
+        ]
+    match type:
+        case 1:
+            for box, text, words in units:
+                x, y, img = drawRectangle(imgCopy, box)
+                labels.append((text, x, y, font, 15, (255, 0, 0)))
+        case 2:
+            found = (extractor or DATE_EXTRACTOR).extract(result, minConfi)
+            covered = set()
+            for item in found:
+                covered.update(item['words'])
+                for i in item['words']:
+                    textBox(result, imgCopy, i, (0, 255, 0))
+                x, y = item['box'][:2]
+                labels.append((item['value'], x, y, font, 15, (0, 255, 0)))
+                data.append(item['value'])
+            for box, text, words in units:
+                if not covered.issuperset(words):
+                    x, y, img = drawRectangle(imgCopy, box)
+    if labels:
+        imgCopy = writeTexts(imgCopy, labels)
     return data, imgCopy
 
 def findWithRegex(text, regex):
@@ -186,6 +381,46 @@ def findWithRegex(text, regex):
     """
     return re.match(regex, text)
 
+def parseTsv(tsv):
+    """
+    Lê o TSV do Tesseract direto para colunas numpy (OcrData).
+
+    As 11 colunas numéricas de todas as linhas são juntadas em um único texto
+    e convertidas de uma vez por np.fromstring, sem criar um objeto Python por
+    campo; só a coluna de texto vira strings. A confiança é truncada para
+    inteiro, como no Output.DICT do pytesseract.
+
+    Args:
+        tsv (str | bytes): Saída TSV do Tesseract, com cabeçalho.
+
+    Raises:
+        ValueError: Caso o TSV não tenha o formato esperado.
+
+    Returns:
+        OcrData: Colunas do resultado.
+    """
+    if isinstance(tsv, str):
+        tsv = tsv.encode('utf-8')
+    lines = tsv.rstrip(b'\r\n').split(b'\n')
+    header = lines[0].rstrip(b'\r').split(b'\t')
+    if [name.decode() for name in header] != list(INT_COLUMNS) + ['text']:
+        raise ValueError(f'Cabeçalho TSV inesperado: {lines[0]!r}')
+    lines = lines[1:]
+    if lines and lines[-1].count(b'\t') < len(INT_COLUMNS):
+        # a última linha perde a célula de texto vazia quando a saída é aparada
+        lines[-1] += b'\t'
+
+    numeric, _, texts = zip(*(line.rpartition(b'\t') for line in lines)) if lines else ((), None, ())
+    values = np.fromstring(b'\t'.join(numeric).decode('ascii'), dtype=np.float64, sep='\t')
+    if values.size != len(lines) * len(INT_COLUMNS):
+        raise ValueError('TSV do Tesseract com número de colunas inválido')
+    values = values.reshape(len(lines), len(INT_COLUMNS)).astype(np.int32).T
+
+    columns = dict(zip(INT_COLUMNS, (np.ascontiguousarray(column) for column in values)))
+    text = b'\n'.join(texts).decode('utf-8').replace('\r', '').split('\n') if lines else []
+    columns['text'] = np.asarray(text, dtype=str)
+    return OcrData(columns)
+
 def imageToString(image, lang, config_tesseract):
     """
     Extrai texto da imagem usando Tesseract.
@@ -198,35 +433,321 @@ def imageToString(image, lang, config_tesseract):
     Returns:
         str: Texto extraído.
     """
+    if _engine == 'capi':
+        return tesseractCapi.imageToString(image, lang, config_tesseract)
     return pytesseract.image_to_string(image, lang=lang, config=config_tesseract)
 
-def imageToOsd(image):
+def imageToOsd(image, config_tesseract=''):
     """
     Retorna informações de orientação e layout da imagem usando Tesseract OSD.
 
     Args:
         image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        config_tesseract (str): Configurações Tesseract (só '--tessdata-dir' e '--dpi'
+            são usados, ver osdConfig).
 
     Returns:
         str: Informações OSD da imagem.
     """
-    return pytesseract.image_to_osd(image)
+    if _engine == 'capi':
+        return tesseractCapi.imageToOsd(image, config_tesseract)
+    return pytesseract.image_to_osd(image, config=osdConfig(config_tesseract))
+
+def osdConfig(config_tesseract):
+    """
+    Monta a configuração do OSD ('-l osd --psm 0') a partir da configuração do OCR.
+
+    Só '--tessdata-dir' e '--dpi' são mantidos; o '--tessdata-dir' só fica se o
+    diretório tiver osd.traineddata (o tessdata do projeto não tem, ver
+    tesseractCapi.osdDatapath), senão o OSD usa o tessdata padrão da instalação.
+    '--psm', '--oem' e '-c' do OCR não valem para o OSD.
+
+    Args:
+        config_tesseract (str): Configurações Tesseract do OCR (ex: '--tessdata-dir tessdata --psm 6').
+
+    Returns:
+        str: Opções a passar junto com '-l osd --psm 0'.
+    """
+    posix = sys.platform != 'win32'
+    args = shlex.split(config_tesseract or '', posix=posix)
+    options = []
+    for option, value in zip(args, args[1:]):
+        if option == '--tessdata-dir':
+            value = tesseractCapi.osdDatapath(value if posix else value.strip('"'))
+        elif option != '--dpi':
+            continue
+        if value:
+            options += [option, shlex.quote(value) if posix else f'"{value}"' if ' ' in value else value]
+    return ' '.join(options)
 
 def imageToData(image, lang, config_tesseract):
     """
     Extrai dados detalhados da imagem usando Tesseract (caixas, confiança, etc.).
 
+    O TSV bruto é convertido por parseTsv em vez do parser linha a linha do pytesseract.
+
     Args:
         image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
         lang (str): Código do idioma.
         config_tesseract (str): Configurações Tesseract.
 
     Returns:
-        dict: Resultado no formato Output.DICT do pytesseract.
+        OcrData: Colunas do image_to_data, indexáveis por nome como o Output.DICT
+        do pytesseract (use toDict() para obter o dict de listas).
     """
-    return pytesseract.image_to_data(
+    if _engine == 'capi':
+        return parseTsv(tesseractCapi.imageToTsv(image, lang, config_tesseract))
+    return parseTsv(pytesseract.image_to_data(
         image, 
         lang=lang, 
         config=config_tesseract, 
-        output_type=Output.DICT
-    )
\ No newline at end of file
+        output_type=Output.BYTES
+    ))
+
+def dataToString(result):
+    """
+    Reconstrói o texto da página a partir do resultado de image_to_data, sem novo OCR.
+
+    Segue o mesmo formato do image_to_string: palavras da linha separadas por
+    espaço, quebra de linha ao fim de cada linha, linha em branco ao fim de
+    cada parágrafo e '\\f' ao fim de cada página.
+
+    Args:
+        result (dict | OcrData): Resultado da função image_to_data do Tesseract.
+
+    Returns:
+        str: Texto reconstruído.
+    """
+    table = OcrData.fromDict(result)
+    selected = table.indices(table.words() & table.nonEmpty())
+    texts = table['text'][selected].tolist()
+    pages = table['page_num'][selected].tolist()
+    blocks = table['block_num'][selected].tolist()
+    pars = table['par_num'][selected].tolist()
+    lines = table['line_num'][selected].tolist()
+
+    parts = []
+    currentLine = currentPar = currentPage = None
+    for text, page, block, parNum, lineNum in zip(texts, pages, blocks, pars, lines):
+        par = (page, block, parNum)
+        line = par + (lineNum,)
+        if line == currentLine:
+            parts.append(' ')
+        elif currentLine is not None:
+            parts.append('\n')
+            if par != currentPar:
+                parts.append('\n')
+            if page != currentPage:
+                parts.append('\f')
+        currentLine, currentPar, currentPage = line, par, page
+        parts.append(text)
+
+    if currentLine is not None:
+        parts.append('\n\n')
+    parts.append('\f')
+    return ''.join(parts)
+
+def wordBoxes(data):
+    """
+    Extrai as palavras reconhecidas e suas caixas do resultado de image_to_data.
+
+    Args:
+        data (dict | OcrData): Resultado da função image_to_data do Tesseract.
+
+    Returns:
+        list[dict]: Uma entrada por palavra com 'text', 'conf', 'left', 'top', 'width' e 'height'.
+    """
+    table = OcrData.fromDict(data)
+    words = table.select(table.words() & table.nonEmpty())
+    return [
+        {'text': text, 'conf': float(conf), 'left': left, 'top': top, 'width': width, 'height': height}
+        for text, conf, left, top, width, height in zip(
+            words['text'].tolist(),
+            words['conf'].tolist(),
+            words['left'].tolist(),
+            words['top'].tolist(),
+            words['width'].tolist(),
+            words['height'].tolist()
+        )
+    ]
+
+class Cancellation:
+    """
+    Sinal para interromper um imageToAll rodando em outra thread.
+
+    Na engine 'cli' o processo tesseract em andamento é encerrado na hora; na
+    engine 'capi' um reconhecimento já iniciado não pode ser interrompido e o
+    cancelamento vale a partir da próxima etapa.
+
+    Uso:
+        cancellation = Cancellation()
+        future = executor.submit(imageToAll, img, 'por', config, cancellation=cancellation)
+        cancellation.cancel()
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.processes = set()
+
+    @property
+    def cancelled(self):
+        """
+        Returns:
+            bool: Se cancel já foi chamado.
+        """
+        return self.event.is_set()
+
+    def cancel(self):
+        """
+        Marca o cancelamento e encerra os processos tesseract em andamento.
+        """
+        with self.lock:
+            self.event.set()
+            processes = list(self.processes)
+        for process in processes:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+
+    def check(self):
+        """
+        Raises:
+            CancelledError: Caso cancel já tenha sido chamado.
+        """
+        if self.event.is_set():
+            raise CancelledError()
+
+    def _start(self, args):
+        with self.lock:
+            self.check()
+            process = subprocess.Popen(args, **pytesseract.pytesseract.subprocess_args())
+            self.processes.add(process)
+        return process
+
+    def _finish(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+def _runTesseract(inputFile, outputBase, extension, lang, config, timeout, cancellation):
+    """
+    Mesma execução do pytesseract.run_tesseract, mas com o processo registrado na
+    Cancellation para que possa ser encerrado por outra thread.
+    """
+    tess = pytesseract.pytesseract
+    if cancellation is None:
+        return tess.run_tesseract(inputFile, outputBase, extension, lang, config, timeout=timeout)
+    args = [tess.tesseract_cmd, inputFile, outputBase, '-l', lang, *shlex.split(config, posix=sys.platform != 'win32')]
+    args += [ext for ext in extension.split() if ext not in {'box', 'osd', 'tsv', 'xml'}]
+    try:
+        process = cancellation._start(args)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError() from None
+    try:
+        with tess.timeout_manager(process, timeout) as errors:
+            pass
+    finally:
+        cancellation._finish(process)
+    cancellation.check()
+    if process.returncode:
+        raise TesseractError(process.returncode, tess.get_errors(errors))
+
+def remainingTime(deadline):
+    """
+    Converte um prazo absoluto no timeout da próxima execução do Tesseract.
+
+    Args:
+        deadline (float | None): Instante limite em time.monotonic() (None = sem limite).
+
+    Raises:
+        TimeoutError: Caso o prazo já tenha passado.
+
+    Returns:
+        float: Segundos restantes (0 = sem limite, como no timeout do pytesseract).
+    """
+    if deadline is None:
+        return 0
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError('O tempo limite foi excedido')
+    return remaining
+
+@contextlib.contextmanager
+def _tesseractTimeout(timeout):
+    # o pytesseract sinaliza o processo encerrado por timeout com um RuntimeError genérico
+    try:
+        yield
+    except RuntimeError as e:
+        if str(e) != 'Tesseract process timeout':
+            raise
+        raise TimeoutError(f'O Tesseract excedeu o tempo limite de {timeout}s') from None
+
+def imageToAll(image, lang, config_tesseract, osd=True, text=True, timeout=0, cancellation=None):
+    """
+    Extrai texto, dados por palavra e orientação (OSD) pagando o reconhecimento uma única vez.
+
+    Na engine 'cli' o texto e o TSV saem da mesma execução do Tesseract
+    (tessedit_create_txt + tessedit_create_tsv) e o OSD reaproveita a mesma
+    imagem temporária em uma execução '--psm 0', que não faz reconhecimento.
+    Na engine 'capi' tudo sai de uma única imagem enviada à API.
+
+    Args:
+        image (numpy.ndarray | PIL.Image.Image): Imagem de entrada.
+        lang (str): Código do idioma (ex: 'por').
+        config_tesseract (str): Configurações Tesseract (ex: '--tessdata-dir tessdata').
+        osd (bool): Se deve detectar a orientação.
+        text (bool): Se deve pedir o texto ao Tesseract. Se False, o texto é
+            reconstruído com dataToString a partir dos dados por palavra.
+        timeout (float): Tempo máximo em segundos das execuções do Tesseract na engine
+            'cli', somando reconhecimento e OSD (0 = sem limite). O processo é encerrado
+            ao estourar.
+        cancellation (Cancellation | None): Sinal para interromper a chamada a partir de outra thread.
+
+    Raises:
+        TimeoutError: Caso o Tesseract estoure o tempo.
+        CancelledError: Caso a chamada seja cancelada.
+
+    Returns:
+        dict: Chaves 'text' (str), 'data' (OcrData, ver parseTsv) e 'osd'
+        (dict do pytesseract, ou None se osd=False ou se o Tesseract não conseguir detectar).
+    """
+    osdText = None
+    if cancellation is not None:
+        cancellation.check()
+    if _engine == 'capi':
+        textOutput, tsv, osdText = tesseractCapi.imageToAll(image, lang, config_tesseract, osd, text)
+    else:
+        tess = pytesseract.pytesseract
+        deadline = time.monotonic() + timeout if timeout else None
+        with tess.save(image) as (tempName, inputFile), _tesseractTimeout(timeout):
+            _runTesseract(
+                inputFile,
+                tempName,
+                'tsv',
+                lang,
+                f'-c tessedit_create_txt={int(text)} -c tessedit_create_tsv=1 {config_tesseract.strip()}',
+                remainingTime(deadline),
+                cancellation
+            )
+            textOutput = tess._read_output(f'{tempName}.txt') if text else None
+            tsv = tess._read_output(f'{tempName}.tsv')
+            if osd:
+                try:
+                    _runTesseract(
+                        inputFile,
+                        tempName,
+                        'osd',
+                        'osd',
+                        f'--psm 0 {osdConfig(config_tesseract)}',
+                        remainingTime(deadline),
+                        cancellation
+                    )
+                    osdText = tess._read_output(f'{tempName}.osd')
+                except TesseractError:
+                    osdText = None
+
+    data = parseTsv(tsv)
+    return {
+        'text': textOutput if text else dataToString(data),
+        'data': data,
+        'osd': pytesseract.pytesseract.osd_to_dict(osdText) if osdText else None
+    }
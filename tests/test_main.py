@@ -0,0 +1,59 @@
+import os
+import cv2 # OpenCV
+import pytest
+import main
+from pytesseract import TesseractNotFoundError
+from preprocessing import estimateOrientation, rotate
+from tesseractUtils import loadImage
+
+"""
+Testes da correção de orientação de main.imageOrientation.
+
+O Tesseract não precisa estar instalado: o OSD é substituído por uma saída
+no formato do `tesseract --psm 0`, em que "Orientation in degrees" é o giro
+horário que a imagem sofreu e "Rotate" o giro horário que a deixa em pé.
+
+Contém testes para:
+- O caminho do OSD girando de volta uma imagem girada
+- O aviso sem giro quando o Tesseract não está disponível
+"""
+
+IMAGE = os.path.join(os.path.dirname(__file__), '..', 'img', 'livro01.jpg')
+
+def osdText(rotated):
+    """
+    Args:
+        rotated (int): Giro anti-horário aplicado à imagem em pé, em graus.
+
+    Returns:
+        str: Saída do OSD do Tesseract para a imagem girada.
+    """
+    orientation = -rotated % 360
+    return (
+        'Page number: 0\n'
+        f'Orientation in degrees: {orientation}\n'
+        f'Rotate: {-orientation % 360}\n'
+        'Orientation confidence: 20.00\n'
+        'Script: Latin\n'
+        'Script confidence: 5.00\n'
+    )
+
+@pytest.mark.parametrize('angle', [90, 180, 270])
+def test_osdRotatesImageBackUpright(monkeypatch, angle):
+    upright = cv2.imread(IMAGE)
+    rotated = rotate(upright, angle)
+    monkeypatch.setattr(main, 'imageToOsd', lambda img, config='': osdText(angle))
+    image = loadImage(cv2.imencode('.png', rotated)[1].tobytes())
+
+    # confiança mínima acima de 1 força o caminho do OSD
+    fixed = rotate(rotated, main.imageOrientation(image, minConfidence=1.1))
+
+    assert fixed.shape == upright.shape
+    estimate = estimateOrientation(fixed)
+    assert estimate['rotate'] == 0 and estimate['confidence'] >= 0.3
+
+def test_missingTesseractKeepsOrientation(monkeypatch):
+    def missing(img, config=''):
+        raise TesseractNotFoundError()
+    monkeypatch.setattr(main, 'imageToOsd', missing)
+    assert main.imageOrientation(IMAGE, minConfidence=1.1) == 0
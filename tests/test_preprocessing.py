@@ -0,0 +1,52 @@
+import glob
+import os
+import cv2 # OpenCV
+import numpy as np
+import pytest
+import preprocessing
+
+"""
+Testes do pré-processamento sobre as imagens de img/.
+
+Todas as imagens de img/ estão em pé.
+
+Contém testes para:
+- Orientação estimada: imagens em pé não são giradas com confiança e imagens
+  giradas com texto suficiente voltam a ficar em pé
+- Morfologia com iterações dobradas em um único kernel igual à chamada do OpenCV
+"""
+
+IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'img', '*.jpg')))
+# confiança a partir da qual a estimativa é aplicada (padrão de deskew e main.imageOrientation)
+MIN_CONFIDENCE = 0.3
+
+@pytest.mark.parametrize('path', IMAGES, ids=os.path.basename)
+def test_uprightImagesStayAtZero(path):
+    estimate = preprocessing.estimateOrientation(cv2.imread(path))
+    assert estimate['rotate'] == 0 or estimate['confidence'] < MIN_CONFIDENCE, estimate
+
+@pytest.mark.parametrize('angle', [90, 180, 270])
+@pytest.mark.parametrize('name', ['livro01.jpg', 'receita02.jpg', 'tabela_teste.jpg'])
+def test_rotatedImagesComeBackUpright(name, angle):
+    img = cv2.imread(os.path.join(os.path.dirname(IMAGES[0]), name))
+    estimate = preprocessing.estimateOrientation(preprocessing.rotate(img, angle))
+    assert estimate['confidence'] >= MIN_CONFIDENCE
+    # 'rotate' é o giro horário que desfaz o giro anti-horário aplicado
+    assert estimate['rotate'] == angle
+
+@pytest.fixture(scope='module', params=IMAGES[:4], ids=os.path.basename)
+def binary(request):
+    return preprocessing.binarizationOtsu(preprocessing.grayscale(cv2.imread(request.param)))
+
+@pytest.mark.parametrize('mode', sorted(preprocessing.MORPHOLOGY_MODES))
+@pytest.mark.parametrize('size', [3, 4, 5, 6, [3, 5], [4, 3]], ids=str)
+@pytest.mark.parametrize('iterations', [1, 2, 3])
+def test_morphologyMatchesOpenCV(binary, mode, size, iterations):
+    width, height = (size, size) if isinstance(size, int) else size
+    expected = cv2.morphologyEx(
+        binary,
+        preprocessing.MORPHOLOGY_MODES[mode],
+        np.ones((height, width), np.uint8),
+        iterations=iterations
+    )
+    assert np.array_equal(preprocessing.morphology(binary, mode, 'rect', size, iterations), expected)
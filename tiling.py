@@ -0,0 +1,141 @@
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import preprocessing
+
+"""
+Execução em blocos (tiles) dos filtros de preprocessing.py em um pool de threads.
+
+Cada filtro de vizinhança só olha um raio fixo em volta de cada pixel (a
+"pegada" do filtro). A imagem é dividida em blocos, cada bloco é processado
+com uma margem (halo) igual a essa pegada e só o miolo do resultado é copiado
+para a saída. Como nas bordas internas o halo traz os pixels reais e nas
+bordas da imagem o OpenCV extrapola do mesmo jeito que na imagem inteira, o
+resultado é idêntico bit a bit ao da chamada única. O OpenCV libera o GIL,
+então os blocos rodam de fato em paralelo.
+
+Contém funções para:
+- Consultar o halo de cada filtro
+- Executar uma função de filtro em blocos com halo
+"""
+
+# Raio (em pixels) que cada etapa lê em volta de cada pixel de saída (ou função dos parâmetros)
+HALOS = {
+    'bilateralBlur': 7,                   # d=15
+    'blurByMedia': 1,                     # ksize=3
+    'blur': 2,                            # 5x5
+    'blurByGaussian': 2,                  # 5x5
+    'removeNoise': 4,                     # dilatação 5x5 + erosão 5x5
+    'binarizationAdaptive': 5,            # blockSize=11
+    'binarizationAdaptiveGaussiana': 5,   # blockSize=11
+    'binarizationSimple': 0,
+    'colorInversion': 0,
+    'morphology': lambda params: _morphologyHalo(**params)
+}
+
+DEFAULT_TILE_SIZE = 512
+
+_executor = None
+_executorLock = threading.Lock()
+
+def _getExecutor():
+    global _executor
+    with _executorLock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='Tiling')
+        return _executor
+
+def _morphologyHalo(mode='close', shape='rect', size=5, iterations=1):
+    width, height = (size, size) if isinstance(size, int) else size
+    radius = max(width, height) // 2 * iterations
+    # abertura, fechamento, top-hat e black-hat encadeiam duas operações
+    return radius if mode in ('erode', 'dilate', 'gradient') else 2 * radius
+
+def halo(name, params=None):
+    """
+    Args:
+        name (str): Nome da etapa de preprocessing.py.
+        params (dict | None): Parâmetros da etapa (o halo da morfologia depende do kernel).
+
+    Returns:
+        int | None: Raio da etapa, ou None se ela não pode rodar em blocos
+        (ex: binarizationOtsu, que usa o histograma da imagem inteira).
+    """
+    value = HALOS.get(name)
+    return value(params or {}) if callable(value) else value
+
+def tiled(func, img, haloSize, tileSize=DEFAULT_TILE_SIZE, dst=None, **params):
+    """
+    Executa um filtro em blocos com halo, em paralelo.
+
+    Args:
+        func (callable): Etapa (img, **params) -> img que preserva o tamanho e só
+            depende de uma vizinhança de raio haloSize.
+        img (numpy.ndarray): Imagem de entrada.
+        haloSize (int): Raio da vizinhança do filtro.
+        tileSize (int): Lado dos blocos (sem o halo).
+        dst (numpy.ndarray | None): Buffer de saída reaproveitado, se tiver o tamanho e tipo certos.
+        **params: Parâmetros repassados à etapa.
+
+    Returns:
+        numpy.ndarray: Mesmo resultado (bit a bit) de func(img, **params).
+    """
+    height, width = img.shape[:2]
+    if height <= tileSize and width <= tileSize:
+        return func(img, dst=dst, **params)
+
+    tiles = [
+        (y, x, min(y + tileSize, height), min(x + tileSize, width))
+        for y in range(0, height, tileSize)
+        for x in range(0, width, tileSize)
+    ]
+
+    def run(tile):
+        y0, x0, y1, x1 = tile
+        top, left = max(0, y0 - haloSize), max(0, x0 - haloSize)
+        bottom, right = min(height, y1 + haloSize), min(width, x1 + haloSize)
+        out = func(img[top:bottom, left:right], **params)
+        return tile, out[y0 - top:y1 - top, x0 - left:x1 - left]
+
+    output = None
+    for (y0, x0, y1, x1), part in _getExecutor().map(run, tiles):
+        if output is None:
+            shape = (height, width) + part.shape[2:]
+            usable = dst is not None and dst.shape == shape and dst.dtype == part.dtype
+            output = dst if usable else np.empty(shape, part.dtype)
+        output[y0:y1, x0:x1] = part
+    return output
+
+def tiledStep(name, tileSize=DEFAULT_TILE_SIZE, params=None):
+    """
+    Versão em blocos de uma etapa de preprocessing.py, com a mesma assinatura.
+
+    Args:
+        name (str): Nome da etapa.
+        tileSize (int): Lado dos blocos.
+        params (dict | None): Parâmetros com que a etapa será chamada (definem o halo).
+
+    Raises:
+        ValueError: Caso a etapa não possa rodar em blocos.
+
+    Returns:
+        callable: Função (img, dst=None, **params) -> img.
+    """
+    haloSize = halo(name, params)
+    if haloSize is None:
+        raise ValueError(f'A etapa {name} não pode ser executada em blocos')
+    return TiledStep(getattr(preprocessing, name), haloSize, tileSize)
+
+class TiledStep:
+    """
+    Etapa executada em blocos. Classe (e não closure) para ser serializável com pickle.
+    """
+
+    def __init__(self, func, haloSize, tileSize):
+        self.func = func
+        self.haloSize = haloSize
+        self.tileSize = tileSize
+
+    def __call__(self, img, dst=None, **params):
+        return tiled(self.func, img, self.haloSize, self.tileSize, dst, **params)
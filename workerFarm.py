@@ -0,0 +1,626 @@
+import os
+import itertools
+import threading
+import time
+import cv2 # OpenCV
+import pytesseract
+import tesseractCapi
+from ocrCache import OcrCache, makeKey
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future, InvalidStateError, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from tesseractUtils import loadImage, imageToAll, setEngine, travelImage, remainingTime
+from imageOutput import ImageWriter, encodeParams
+from logUtils import configureLogging, currentLevel, getLogger
+from multiprocessing import util
+
+"""
+Fazenda de processos para executar o fluxo de OCR sobre muitas imagens.
+
+Cada processo carrega as configurações (pré-processamento, idioma, config e
+engine do Tesseract) uma única vez no inicializador e depois só recebe
+caminhos (ou bytes) de imagens. Com a engine 'capi' o traineddata também é carregado
+uma única vez por processo.
+
+Contém funções para:
+- Inicializar os processos trabalhadores
+- Executar um job de OCR (leitura, pré-processamento e OCR), com cache opcional
+- Executar o OCR em cascata (pré-processamento mais pesado só quando a confiança é baixa)
+  ou em corrida (vários pré-processamentos em paralelo, fica o melhor)
+- Gravar a imagem pré-processada e a anotada em segundo plano (modo headless)
+- Distribuir jobs com concorrência configurável, timeout e resultados em ordem ou não
+- Reciclar os processos quando um job fica preso além do timeout ou um processo morre
+- Aquecer os processos e devolver a imagem anotada codificada (modo serviço)
+"""
+
+logger = getLogger('workerFarm')
+
+# tolerância além do timeout antes de considerar o job preso e reciclar os processos
+STUCK_GRACE = 2.0
+# intervalo com que a vigia de submit confere jobs presos e processos mortos
+WATCH_INTERVAL = 0.25
+
+_settings = None
+_cache = None
+_writer = None
+_jobCount = 0
+
+def _initWorker(settings):
+    """
+    Inicializador de cada processo: guarda as configurações e aquece a engine.
+
+    Args:
+        settings (dict): Configurações montadas por OcrWorkerFarm.
+    """
+    global _settings, _cache, _writer
+    _settings = settings
+    # com o método spawn o processo não herda a configuração do log do processo principal
+    configureLogging(settings['logLevel'])
+    if settings['cacheEntries'] or settings['cacheDir']:
+        _cache = OcrCache(settings['cacheEntries'], settings['cacheDir'])
+    if settings['outputDir']:
+        _writer = ImageWriter(settings['outputDir'], settings['outputFormat'], settings['outputQuality'])
+        # garante que as últimas gravações terminem antes do processo sair
+        util.Finalize(_writer, _writer.close, exitpriority=10)
+    if settings['tesseractCmd']:
+        pytesseract.pytesseract.tesseract_cmd = settings['tesseractCmd']
+    setEngine(settings['engine'])
+    if settings['engine'] == 'capi':
+        options = tesseractCapi.parseConfig(settings['config'])
+        tesseractCapi.getApi(settings['lang'], options['datapath'], options['oem'])
+
+def _ping(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+def _runJob(job, annotatedFormat=None):
+    """
+    Executa o fluxo completo de OCR de uma imagem dentro do processo trabalhador.
+
+    Qualquer falha volta como texto em 'error' ('timeout' ou '<Tipo>: mensagem'):
+    só o resultado atravessa a fronteira entre processos, e exceções que não
+    podem ser serializadas (ex: TesseractNotFoundError) quebrariam o pool.
+
+    O arquivo é lido e decodificado uma única vez (loadImage). Com timeout, o
+    prazo conta a partir do início do job no processo: cada execução do
+    Tesseract recebe só o tempo que resta (na engine 'cli' o processo é
+    encerrado ao estourar) e o prazo é conferido entre as etapas.
+
+    Args:
+        job (str | bytes): Caminho da imagem ou conteúdo do arquivo.
+        annotatedFormat (str | None): Se informado ('jpg', 'png' ou 'webp'), devolve
+            também a imagem anotada por travelImage, codificada nesse formato. Nesse
+            caso o cache não é consultado (a anotação precisa da imagem pré-processada).
+
+    Returns:
+        dict: Resultado com 'path', 'text', 'data', 'osd', 'timings' (segundos), 'cache',
+        'outputs' (arquivos agendados para gravação), 'cascade' / 'race' (relatório da
+        estratégia, se houver), 'annotated' (bytes ou None) e 'error'.
+    """
+    try:
+        return _ocrJob(job, annotatedFormat)
+    except TimeoutError:
+        return _errorResult(job, 'timeout')
+    except Exception as e:
+        return _errorResult(job, f'{type(e).__name__}: {e}')
+
+def _ocrJob(job, annotatedFormat):
+    settings = _settings
+    timings = {}
+    deadline = time.monotonic() + settings['timeout'] if settings['timeout'] else None
+    start = time.perf_counter()
+    img = loadImage(job).bgr
+    timings['read'] = time.perf_counter() - start
+
+    key = None
+    if _cache is not None:
+        key = makeKey(img, settings['lang'], settings['config'], {
+            'preprocess': settings['preprocess'],
+            'strategy': settings['strategy'],
+            'engine': settings['engine'],
+            'osd': settings['osd']
+        })
+        cached, tier = _cache.lookup(key) if annotatedFormat is None else (None, None)
+        if cached is not None:
+            result = dict(cached)
+            result['path'] = job if isinstance(job, str) else None
+            result['timings'] = timings
+            result['cache'] = {'status': tier, 'worker': os.getpid(), 'stats': _cache.stats()}
+            result['outputs'] = []
+            result['annotated'] = None
+            result['error'] = None
+            return result
+
+    if settings['strategy'] is not None:
+        result = settings['strategy'].run(
+            img,
+            settings['lang'],
+            settings['config'],
+            osd=settings['osd'],
+            timeout=remainingTime(deadline)
+        )
+        img = result.pop('image')
+        timings.update(result.pop('timings'))
+        result.setdefault('cascade', None)
+        result.setdefault('race', None)
+    else:
+        start = time.perf_counter()
+        if settings['preprocess'] is not None:
+            img = settings['preprocess'](img)
+        timings['preprocess'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = imageToAll(
+            img,
+            settings['lang'],
+            settings['config'],
+            osd=settings['osd'],
+            text=False,
+            timeout=remainingTime(deadline)
+        )
+        timings['ocr'] = time.perf_counter() - start
+        result['cascade'] = None
+        result['race'] = None
+
+    outputs = []
+    if _writer is not None:
+        name = _outputName(job)
+        outputs.append(_writer.path(f'{name}.pre'))
+        _writer.save(img, f'{name}.pre')
+        if settings['annotate']:
+            _, annotated = travelImage(img, result['data'], settings['minConfi'], 1)
+            outputs.append(_writer.path(f'{name}.box'))
+            _writer.save(annotated, f'{name}.box', copy=False)
+
+    annotatedImage = None
+    if annotatedFormat is not None:
+        _, annotated = travelImage(img, result['data'], settings['minConfi'], 1)
+        annotatedImage = cv2.imencode(f'.{annotatedFormat}', annotated, encodeParams(annotatedFormat, 90))[1].tobytes()
+
+    cache = None
+    if _cache is not None:
+        _cache.put(key, result)
+        result = dict(result)
+        cache = {'status': 'miss', 'worker': os.getpid(), 'stats': _cache.stats()}
+
+    result['path'] = job if isinstance(job, str) else None
+    result['timings'] = timings
+    result['cache'] = cache
+    result['outputs'] = outputs
+    result['annotated'] = annotatedImage
+    result['error'] = None
+    return result
+
+def _outputName(job):
+    global _jobCount
+    _jobCount += 1
+    if isinstance(job, str):
+        return os.path.splitext(os.path.basename(job))[0]
+    return f'job-{os.getpid()}-{_jobCount}'
+
+def _errorResult(job, error):
+    return {
+        'path': job if isinstance(job, str) else None,
+        'text': None,
+        'data': None,
+        'osd': None,
+        'timings': {},
+        'cache': None,
+        'outputs': [],
+        'cascade': None,
+        'race': None,
+        'annotated': None,
+        'error': error
+    }
+
+class OcrWorkerFarm:
+    """
+    Pool de processos de OCR com trabalhadores de longa duração.
+
+    Uso:
+        with OcrWorkerFarm(workers=4, preprocess=grayscale) as farm:
+            for result in farm.map(paths, ordered=False):
+                ...
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        preprocess=None,
+        lang='por',
+        config='--tessdata-dir tessdata',
+        engine='cli',
+        osd=False,
+        timeout=None,
+        tesseractCmd=None,
+        cacheEntries=0,
+        cacheDir=None,
+        outputDir=None,
+        outputFormat='jpg',
+        outputQuality=90,
+        annotate=False,
+        minConfi=40,
+        strategy=None,
+        logLevel=None
+    ):
+        """
+        Args:
+            workers (int | None): Número de processos. Se None, usa os.cpu_count().
+            preprocess (callable | None): Função img -> img aplicada antes do OCR.
+                Precisa ser serializável (função de módulo ou functools.partial).
+            lang (str): Código do idioma.
+            config (str): Configurações Tesseract.
+            engine (str): Engine do Tesseract ('cli' ou 'capi').
+            osd (bool): Se deve detectar a orientação de cada imagem.
+            timeout (float | None): Tempo máximo por job em segundos, contado a partir
+                do início do job no processo. Na engine 'cli' o processo tesseract é
+                encerrado; em qualquer engine o job é reportado com erro 'timeout'.
+                Um job que passe de timeout + STUCK_GRACE (ex: preso na engine 'capi')
+                tem os processos reciclados por map.
+            tesseractCmd (str | None): Caminho do executável tesseract.
+            cacheEntries (int): Tamanho do cache LRU em memória de cada processo (0 = desligado).
+            cacheDir (str | None): Diretório do cache em disco, compartilhado entre os processos.
+            outputDir (str | None): Diretório onde gravar a imagem pré-processada de cada
+                job ('<nome>.pre.<formato>'). A gravação roda em threads do próprio processo.
+                Jobs atendidos pelo cache não gravam imagens.
+            outputFormat (str): Formato das imagens gravadas ('jpg', 'png' ou 'webp').
+            outputQuality (int): Qualidade de 0 a 100.
+            annotate (bool): Se também deve gravar a imagem anotada por travelImage
+                ('<nome>.box.<formato>'). Requer outputDir.
+            minConfi (int): Confiança mínima das palavras anotadas.
+            strategy (OcrCascade | OcrRace | None): Se informada, substitui preprocess e o
+                OCR simples: a cascata tenta níveis cada vez mais pesados até atingir a
+                confiança alvo e a corrida roda vários candidatos e fica com o melhor.
+            logLevel (str | None): Nível de log dos processos (ver logUtils). Se None, usa
+                o nível atual do processo principal.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.workerCacheStats = {}
+        self.warm = False
+        self.recycled = 0
+        # jobs enviados por submit, acompanhados pela vigia (future interno -> registro)
+        self.supervised = {}
+        self.retry = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        # serializa envios e reciclagens do executor (nunca tomado por quem segura self.lock)
+        self.executorLock = threading.RLock()
+        self.stopping = threading.Event()
+        self.watchdog = None
+        self.settings = {
+            'preprocess': preprocess,
+            'lang': lang,
+            'config': config,
+            'engine': engine,
+            'osd': osd,
+            'timeout': timeout,
+            'tesseractCmd': tesseractCmd or pytesseract.pytesseract.tesseract_cmd,
+            'cacheEntries': cacheEntries,
+            'cacheDir': cacheDir,
+            'outputDir': outputDir,
+            'outputFormat': outputFormat,
+            'outputQuality': outputQuality,
+            'annotate': annotate,
+            'minConfi': minConfi,
+            'strategy': strategy,
+            'logLevel': logLevel or currentLevel()
+        }
+        self.executor = self._createExecutor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self, cancelPending=False):
+        """
+        Encerra os processos trabalhadores.
+
+        Args:
+            cancelPending (bool): Se deve cancelar os jobs ainda não iniciados.
+        """
+        self.stopping.set()
+        if self.watchdog is not None:
+            self.watchdog.join()
+        self.executor.shutdown(wait=True, cancel_futures=cancelPending)
+
+    def warmUp(self, delay=0.1):
+        """
+        Sobe todos os processos e aguarda o inicializador de cada um (engine, cache,
+        traineddata), para que o primeiro job real não pague esse custo.
+
+        Args:
+            delay (float): Tempo que cada ping segura o processo, para que os pings
+                enviados juntos caiam em processos diferentes.
+
+        Returns:
+            int: Quantidade de processos distintos que responderam.
+        """
+        # um ping por processo enviado de uma vez: sem processos ociosos, o executor cria um novo
+        futures = [self.executor.submit(_ping, delay) for _ in range(self.workers)]
+        workers = len({future.result() for future in futures})
+        self.warm = True
+        return workers
+
+    def submit(self, job, annotatedFormat=None):
+        """
+        Envia um único job.
+
+        Uma thread vigia os jobs enviados por aqui, como map faz com os seus: se
+        um job passar de timeout + STUCK_GRACE em execução ele volta com erro
+        'timeout' e os processos são reciclados; se um processo morrer (pool
+        quebrado) os processos também são reciclados. Os outros jobs atingidos
+        pela reciclagem são reenviados uma vez, sem trocar o Future devolvido.
+
+        Args:
+            job (str | bytes): Caminho da imagem ou conteúdo do arquivo.
+            annotatedFormat (str | None): Formato da imagem anotada a devolver em
+                'annotated' ('jpg', 'png' ou 'webp'); None = sem imagem.
+
+        Returns:
+            concurrent.futures.Future: Future com o dict de resultado de _runJob.
+        """
+        record = {
+            'job': job,
+            'annotatedFormat': annotatedFormat,
+            'sequence': next(self.sequence),
+            'inner': None,
+            'started': None,
+            'stuck': False,
+            'retried': False,
+            'cancelling': False
+        }
+        record['outer'] = _FarmFuture(record)
+        with self.lock:
+            if self.watchdog is None:
+                self.watchdog = threading.Thread(target=self._watch, name='OcrWorkerFarm-watchdog', daemon=True)
+                self.watchdog.start()
+        self._dispatch(record)
+        return record['outer']
+
+    def map(self, paths, ordered=True):
+        """
+        Processa as imagens mantendo no máximo um job por processo em andamento.
+
+        O prazo de cada job é controlado dentro do processo (ver _runJob). Se um
+        job não voltar até timeout + STUCK_GRACE, ele é reportado com 'timeout',
+        os processos são reciclados (um processo preso não pode ser interrompido
+        de fora sem quebrar o pool) e os outros jobs em andamento são reenviados,
+        para que nenhum job novo fique na fila atrás do preso. Se um processo
+        morrer (pool quebrado), os processos também são reciclados e os jobs
+        atingidos são reenviados uma vez.
+
+        Args:
+            paths (Iterable[str]): Caminhos das imagens (pode ser um gerador).
+            ordered (bool): Se True, os resultados saem na ordem de entrada;
+                se False, saem na ordem em que ficam prontos.
+
+        Yields:
+            dict: Resultado de cada imagem. Falhas e timeouts aparecem com 'error' preenchido.
+        """
+        window = self.workers
+        paths = iter(paths)
+        pending = deque()
+        if self.timeout and not self.warm:
+            # sobe os processos antes, para o início do pool não contar no prazo do primeiro job
+            self.warmUp()
+
+        def refill():
+            while len(pending) < window:
+                path = next(paths, None)
+                if path is None:
+                    return
+                pending.append((path, self._submitJob(path), time.monotonic(), False))
+
+        refill()
+        while pending:
+            if ordered:
+                finished = [pending.popleft()]
+            else:
+                done, _ = wait([item[1] for item in pending], timeout=self._remaining(pending), return_when=FIRST_COMPLETED)
+                finished = [item for item in pending if item[1] in done or self._expired(item)]
+                for item in finished:
+                    pending.remove(item)
+            # jobs atingidos por um processo que morreu são reenviados uma vez; na
+            # segunda queda o job é reportado (pode ser ele quem derruba o processo)
+            broken = [item for item in finished if not item[3] and _brokenPool(item[1])]
+            results = [self._collect(*item[:3]) for item in finished if item not in broken]
+            if any(result['error'] == 'stuck' for result in results):
+                self._recycle(f'job preso além de {self._limit()}s')
+                self._resubmit(pending, retried=False)
+            if broken:
+                if self.executor._broken:
+                    self._recycle('processo encerrado inesperadamente')
+                self._resubmit(pending, retried=True)
+                for path, *_ in reversed(broken):
+                    pending.appendleft((path, self._submitJob(path), time.monotonic(), True))
+            for result in results:
+                if result['error'] == 'stuck':
+                    result['error'] = 'timeout'
+                yield result
+            refill()
+
+    def cacheStats(self):
+        """
+        Soma os contadores de cache mais recentes reportados por cada processo.
+
+        Returns:
+            dict: Acertos (memória/disco), faltas, remoções e entradas em memória.
+        """
+        total = {}
+        for stats in self.workerCacheStats.values():
+            for name, value in stats.items():
+                total[name] = total.get(name, 0) + value
+        return total
+
+    def _createExecutor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_initWorker,
+            initargs=(self.settings,)
+        )
+
+    def _recycle(self, reason, executor=None):
+        """
+        Encerra todos os processos (um deles preso em um job ou morto) e cria um pool novo.
+
+        Args:
+            reason (str): Motivo registrado no log.
+            executor (ProcessPoolExecutor | None): Se informado, só recicla se ele ainda
+                for o executor atual (outra thread pode já ter reciclado).
+        """
+        with self.executorLock:
+            if executor is not None and executor is not self.executor:
+                return
+            executor = self.executor
+            # o ProcessPoolExecutor não expõe como encerrar um processo específico
+            for process in list(executor._processes.values()):
+                process.kill()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.recycled += 1
+            self.executor = self._createExecutor()
+            self.warm = False
+            logger.warning('%s - processos reciclados', reason)
+            self.warmUp()
+
+    def _submitJob(self, job, annotatedFormat=None):
+        with self.executorLock:
+            executor = self.executor
+            try:
+                return executor.submit(_runJob, job, annotatedFormat)
+            except BrokenProcessPool:
+                self._recycle('processo encerrado inesperadamente', executor)
+                return self.executor.submit(_runJob, job, annotatedFormat)
+
+    def _resubmit(self, pending, retried):
+        for index, (path, future, _, wasRetried) in enumerate(pending):
+            if future.cancelled():
+                pending[index] = (path, self._submitJob(path), time.monotonic(), wasRetried)
+            elif not wasRetried and _brokenPool(future):
+                pending[index] = (path, self._submitJob(path), time.monotonic(), retried)
+
+    def _dispatch(self, record):
+        if record['outer'].done():
+            return
+        with self.executorLock:
+            inner = self._submitJob(record['job'], record['annotatedFormat'])
+            record['executor'] = self.executor
+        with self.lock:
+            record['inner'] = inner
+            record['started'] = None
+            self.supervised[inner] = record
+        inner.add_done_callback(self._settle)
+
+    def _settle(self, inner):
+        # roda na thread do executor ao fim de cada job de submit: repassa o resultado
+        # ou separa o job para a vigia reenviar depois da reciclagem
+        with self.lock:
+            record = self.supervised.pop(inner, None)
+            if record is None or record['cancelling'] or record['outer'].done():
+                return
+            if inner.cancelled():
+                # cancelado pela reciclagem antes de começar: reenvio não conta como tentativa
+                self.retry.append(record)
+                return
+            error = inner.exception()
+            if error is None:
+                result = inner.result()
+            elif record['stuck']:
+                result = _errorResult(record['job'], 'timeout')
+            elif isinstance(error, BrokenProcessPool) and not record['retried']:
+                record['retried'] = True
+                self.retry.append(record)
+                return
+            else:
+                result = _errorResult(record['job'], f'{type(error).__name__}: {error}')
+        try:
+            record['outer'].set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _watch(self):
+        while not self.stopping.wait(WATCH_INTERVAL):
+            try:
+                self._checkSupervised()
+            except Exception:
+                logger.exception('falha na vigia dos jobs')
+
+    def _checkSupervised(self):
+        now = time.monotonic()
+        with self.lock:
+            executor = self.executor
+            # o executor marca como "em execução" os jobs em andamento mais um na fila
+            # interna; em ordem de envio, os primeiros `workers` são os que rodam
+            running = sorted(
+                (record for record in self.supervised.values() if record['inner'].running()),
+                key=lambda record: record['sequence']
+            )[:self.workers]
+            stuck = False
+            for record in running:
+                if record['started'] is None:
+                    record['started'] = now
+                elif self.timeout and now - record['started'] > self._limit():
+                    record['stuck'] = True
+                    stuck = True
+            broken = any(record['executor'] is executor for record in self.retry)
+        if stuck:
+            self._recycle(f'job preso além de {self._limit()}s', executor)
+        elif broken and executor._broken:
+            self._recycle('processo encerrado inesperadamente', executor)
+        with self.lock:
+            retry, self.retry = self.retry, []
+        for record in retry:
+            self._dispatch(record)
+
+    def _limit(self):
+        return self.timeout + STUCK_GRACE if self.timeout else None
+
+    def _remaining(self, pending):
+        if not self.timeout:
+            return None
+        oldest = min(item[2] for item in pending)
+        return max(0, oldest + self._limit() - time.monotonic())
+
+    def _expired(self, item):
+        return bool(self.timeout) and time.monotonic() - item[2] >= self._limit()
+
+    def _collect(self, path, future, submitted):
+        remaining = None
+        if self.timeout:
+            remaining = max(0, submitted + self._limit() - time.monotonic())
+        try:
+            result = future.result(timeout=remaining)
+            if result['cache']:
+                self.workerCacheStats[result['cache']['worker']] = result['cache']['stats']
+            return result
+        except FutureTimeoutError:
+            if not future.done():
+                # o job não voltou nem com a tolerância: map recicla os processos
+                future.cancel()
+                return _errorResult(path, 'stuck')
+            return _errorResult(path, 'timeout')
+        except Exception as e:
+            return _errorResult(path, f'{type(e).__name__}: {e}')
+
+class _FarmFuture(Future):
+    """
+    Future devolvido por OcrWorkerFarm.submit. Continua o mesmo quando o job é
+    reenviado a um pool novo; cancel só funciona enquanto o job não começou.
+    """
+
+    def __init__(self, record):
+        super().__init__()
+        self.record = record
+
+    def cancel(self):
+        inner = self.record['inner']
+        self.record['cancelling'] = True
+        if inner is None or not inner.cancel():
+            self.record['cancelling'] = False
+            return False
+        return super().cancel()
+
+def _brokenPool(future):
+    return future.done() and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)